@@ -1,4 +1,6 @@
 import os
+import asyncio
+import contextlib
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,6 +12,14 @@ from app.database import engine, Base, AsyncSessionLocal
 from app.routers import auth, titles, seasons, media, settings, user_settings, root, integrations, config, episodes, collections
 from app.settings.seed import init_settings
 from app.services.genres import update_genres
+from app.services.image_processing import shutdown_image_pool
+from app.services.image_prefetch import stop_image_prefetch
+from app.services.image_quota import run_image_quota_loop
+from app.services.image_storage import load_presence_filter
+from app.services.library_walker import shutdown_walk_pool
+from app.services.library_watcher import run_library_watcher
+from app.services.media_probe import shutdown_probe_pool
+from app.services.sync_jobs import stop_sync_jobs
 
 # Setup ENVs
 config
@@ -22,8 +32,24 @@ async def lifespan(app: FastAPI):
         await init_settings(db)
         await update_genres(db, force_update=False)
 
+    # Existence checks use the filesystem until the scan has finished
+    presence_task = asyncio.create_task(asyncio.to_thread(load_presence_filter))
+    image_quota_task = asyncio.create_task(run_image_quota_loop())
+    library_watcher_task = asyncio.create_task(run_library_watcher())
+
     yield
 
+    for task in (image_quota_task, library_watcher_task):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await stop_sync_jobs()
+    await presence_task
+    await stop_image_prefetch()
+    shutdown_image_pool()
+    shutdown_probe_pool()
+    shutdown_walk_pool()
+
 app = FastAPI(
     root_path=PROXY_ROOT_PATH,
     lifespan=lifespan
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import CheckConstraint, Column, Float, Integer, String, DECIMAL, BigInteger, Date, Text, Boolean, Enum, ForeignKey, UniqueConstraint, DateTime
+from sqlalchemy import CheckConstraint, Column, Float, Integer, String, DECIMAL, BigInteger, Date, Text, Boolean, Enum, ForeignKey, UniqueConstraint, DateTime, JSON
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -389,6 +389,7 @@ class Image(Base):
     iso_639_1 = Column(String(5))
     vote_average = Column(DECIMAL(5,3))
     vote_count = Column(Integer)
+    placeholder = Column(Text)  # Tiny data URI preview, set when the original is first downloaded
 
     links = relationship("ImageLink", back_populates="image", cascade="all, delete-orphan")
 
@@ -429,6 +430,8 @@ class TitleFolder(Base):
     title_folder_name = Column(String(256), nullable=False)
 
     title_id = Column(Integer, ForeignKey("titles.title_id", ondelete="CASCADE"), nullable=True, unique=True)
+    # Hash of the title, its episodes and the folder's assets as of the last asset link pass
+    link_fingerprint = Column(String(32), nullable=True)
 
     title = relationship("Title", back_populates="title_folder")
     video_assets = relationship("VideoAsset", back_populates="title_folder", cascade="all, delete-orphan")
@@ -461,3 +464,19 @@ class VideoAsset(Base):
 
     title_folder = relationship("TitleFolder", back_populates="video_assets")
     episode = relationship("Episode", back_populates="video_assets")
+
+
+class MediaProbe(Base):
+    """MediaInfo results by file identity, so moved or remounted files aren't probed again."""
+    __tablename__ = "media_probes"
+    __table_args__ = (
+        UniqueConstraint("device", "inode", "size", "mtime", name="uq_media_probe_stat"),
+    )
+
+    media_probe_id = Column(Integer, primary_key=True, autoincrement=True)
+    device = Column(BigInteger, nullable=False)
+    inode = Column(BigInteger, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime = Column(Float, nullable=False)
+    partial_hash = Column(String(32), nullable=False, index=True)
+    media_info = Column(JSON, nullable=False)
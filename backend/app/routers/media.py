@@ -1,101 +1,41 @@
 import os
-import asyncio
-import aiofiles
-import httpx
-import shutil
-from PIL import Image
-from typing import List
+import contextlib
+from typing import Dict, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException, Query, Request, Response, Depends
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_, and_, distinct
 from sqlalchemy.orm import selectinload
-from app.services.video_assets import sync_all_video_assets
+from app.services.sync_jobs import SyncJob, cancel_sync_job, get_sync_job, iter_sync_events, start_sync_job
+from app.services.http_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    build_stat_etag,
+    format_last_modified,
+    if_range_allows,
+    is_not_modified
+)
+from app.services.image_cache import (
+    FORMAT_MEDIA_TYPES, IMAGE_DERIVATIVE_FORMATS, TMDB_IMAGE_BASE_PATH,
+    bucket_folder, ensure_image, http_client, image_etag, negotiate_image_format, pick_bucket
+)
+from app.services.image_prefetch import enqueue_image_prefetch
+from app.services.image_processing import fit_long_side, format_server_timing
+from app.services.image_quota import record_image_access
+from app.services.image_storage import image_exists, image_may_exist, local_image_path
+from app.services.hls import get_hls_index, render_hls_playlist
+from app.services.video_streaming import VideoFileResponse, get_video_content_type, parse_byte_ranges, resolve_video_asset
 from app.services.languages import LanguageContext, get_user_language_context, pick_translation
 from app.dependencies import get_db
-from app.models import Episode, Season, Title, TitleFolder, User, VideoAsset
+from app.models import Episode, Image, Season, Title, TitleFolder, User, VideoAsset
 from app.enums import VideoType
-from app.schemas import EpisodeMinimalOut, FolderRequest, TitleMinimalOut, VideoAssetExpandedOut, TitleFoldersResponseOut
+from app.schemas import (
+    EpisodeMinimalOut, FolderRequest, ImageBatchIn, ImageBatchItemOut, ImageBatchOut,
+    TitleMinimalOut, VideoAssetExpandedOut, TitleFoldersResponseOut, VideoSyncJobOut
+)
 from app.routers.auth import get_current_user
 
 router = APIRouter()
 
-TMDB_IMAGE_BASE_PATH = "https://image.tmdb.org/t/p"
-LOCAL_IMAGE_BASE_PATH = os.environ["IMAGE_STORAGE_PATH"]
-
-BUCKETS = [400, 800, 1600]  # original handled separately
-
-http_client = httpx.AsyncClient(timeout=None)
-
-def pick_bucket(long_side: int):
-    for b in BUCKETS:
-        if long_side <= b:
-            return b
-    return None
-
-async def _resize_image(original_path: str, target_path: str, long_side: int):
-    loop = asyncio.get_event_loop()
-
-    def _resize():
-        with Image.open(original_path) as img:
-            if img.format == 'SVG':
-                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                shutil.copy2(original_path, target_path)
-                return
-
-            width, height = img.size
-            if width >= height:
-                new_width = long_side
-                new_height = int(height * (long_side / width))
-            else:
-                new_height = long_side
-                new_width = int(width * (long_side / height))
-            
-            img_resized = img.resize((new_width, new_height), Image.LANCZOS)
-
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-
-            # Check if image has transparency
-            if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
-                # Keep as PNG to preserve transparency
-                img_resized.save(target_path, "PNG", optimize=True)
-            else:
-                # Convert to RGB and save as progressive JPEG
-                if img_resized.mode != "RGB":
-                    img_resized = img_resized.convert("RGB")
-                img_resized.save(target_path, "JPEG", progressive=True, quality=85)
-
-    await loop.run_in_executor(None, _resize)
-
-async def _download_original(image_path: str, local_path: str):
-    url = f"{TMDB_IMAGE_BASE_PATH}/original/{image_path}"
-    os.makedirs(os.path.dirname(local_path), exist_ok=True)
-
-    async with httpx.AsyncClient(timeout=None) as client:
-        resp = await client.get(url)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=resp.status_code, detail="Image not found")
-        async with aiofiles.open(local_path, "wb") as f:
-            await f.write(resp.content)
-
-async def _make_progressive(input_path: str, output_path: str):
-    """Re-saves an image appropriately: PNG for transparency, Progressive JPEG otherwise."""
-    def _process():
-        with Image.open(input_path) as img:
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            if (img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)):
-                # Keep as PNG to preserve transparency
-                img.save(output_path, "PNG", optimize=True)
-            else:
-                # Convert to RGB and save as progressive JPEG
-                if img.mode != "RGB":
-                    img = img.convert("RGB")
-                img.save(output_path, "JPEG", progressive=True, quality=95)
-    
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _process)
-
 async def _proxy_image(image_path: str, size: int):
     url = f"{TMDB_IMAGE_BASE_PATH}/{'original' if size == 'original' else 'w500'}/{image_path}"
     
@@ -112,14 +52,67 @@ async def _proxy_image(image_path: str, size: int):
         background=resp.aclose
     )
 
+async def _serve_image(
+    request: Request,
+    local_file_path: str,
+    timings: Optional[Dict[str, float]] = None,
+    fmt: Optional[str] = None,
+    negotiated: bool = False
+):
+    # Stored images never change for a given TMDB path, so they can be cached forever
+    stat_result = os.stat(local_file_path)
+    record_image_access(local_file_path)
+    etag = await image_etag(local_file_path, stat_result)
+    last_modified = format_last_modified(stat_result)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL
+    }
+    if timings:
+        headers["Server-Timing"] = format_server_timing(timings)
+    if negotiated:
+        headers["Vary"] = "Accept"
+
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    # File names keep the TMDB extension, so the type can't be guessed for WebP/AVIF
+    return FileResponse(
+        local_file_path, headers=headers, stat_result=stat_result, media_type=FORMAT_MEDIA_TYPES.get(fmt)
+    )
+
+def _resolve_image_folder(size: str, image_path: str, accept: Optional[str]) -> Tuple[str, Optional[int], Optional[str], bool]:
+    """Returns (folder, bucket, format, whether the format depends on Accept) for a requested size."""
+    if size == "original":
+        return "original", None, None, False
+
+    try:
+        requested_size = int(size)
+        bucket = pick_bucket(requested_size)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid size")
+
+    if not bucket:
+        return "original", None, None, False
+
+    # SVG logos are copied as is, there's nothing to re-encode
+    negotiated = bool(IMAGE_DERIVATIVE_FORMATS and not image_path.lower().endswith(".svg"))
+    fmt = negotiate_image_format(accept) if negotiated else None
+    return bucket_folder(bucket, fmt), bucket, fmt, negotiated
+
 @router.get("/image/{size}/{image_path:path}")
 async def get_image(
     size: str, 
     image_path: str, 
+    request: Request,
     store: bool = Query(True)
 ):
     """
     Valid size values: `400`, `800`, `1600` & `original`.
+
+    Sized images are served as WebP/AVIF when the Accept header lists one of
+    the enabled IMAGE_DERIVATIVE_FORMATS, otherwise as JPEG/PNG.
     
     If store=false:
     - Checks local storage first to save bandwidth.
@@ -128,145 +121,171 @@ async def get_image(
     """
 
     # Determine local pathing
-    if size == "original":
-        bucket = None
-        target_folder = os.path.join(LOCAL_IMAGE_BASE_PATH, "original")
-    else:
-        try:
-            requested_size = int(size)
-            bucket = pick_bucket(requested_size)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid size")
-        
-        target_folder = os.path.join(LOCAL_IMAGE_BASE_PATH, str(bucket) if bucket else "original")
-
-    local_file_path = os.path.join(target_folder, image_path)
-
-    # Serve from files
-    if os.path.exists(local_file_path):
-        return FileResponse(local_file_path)
+    folder, bucket, fmt, negotiated = _resolve_image_folder(size, image_path, request.headers.get("accept"))
+    local_file_path = local_image_path(folder, image_path)
+
+    # Serve from files. The presence filter rules out misses without touching
+    # the disk, a stale hit for an evicted file just falls through.
+    if image_may_exist(folder, image_path):
+        with contextlib.suppress(FileNotFoundError):
+            return await _serve_image(request, local_file_path, fmt=fmt, negotiated=negotiated)
 
     # Passthrough
     if not store:
+        # A stored JPEG still beats a round trip to TMDB
+        if fmt and image_may_exist(bucket_folder(bucket), image_path):
+            with contextlib.suppress(FileNotFoundError):
+                return await _serve_image(
+                    request, local_image_path(bucket_folder(bucket), image_path), negotiated=negotiated
+                )
         return await _proxy_image(image_path, size)
 
-    # Store originial
-    if size == "original":
-        temp_original = local_file_path + ".tmp"
-        await _download_original(image_path, temp_original)
-        
-        if image_path.lower().endswith('.svg'):
-            os.replace(temp_original, local_file_path)
-        else:
-            await _make_progressive(temp_original, local_file_path)
-            os.remove(temp_original)
-            
-        return FileResponse(local_file_path)
+    # Only one download/resize per image and size, concurrent requests wait for it
+    timings = await ensure_image(image_path, folder)
+    return await _serve_image(request, local_file_path, timings, fmt=fmt, negotiated=negotiated)
 
-    # Store resized
-    else:
-        original_path = os.path.join(LOCAL_IMAGE_BASE_PATH, "original", image_path)
-        if not os.path.exists(original_path):
-            await _download_original(image_path, original_path)
-        
-        await _resize_image(original_path, local_file_path, bucket)
-        return FileResponse(local_file_path)
 
+@router.post("/images/batch", response_model=ImageBatchOut)
+async def get_image_batch(
+    data: ImageBatchIn,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cache status, served dimensions, placeholder and URL for many images in
+    one call. With `warm` the missing ones are queued for background download
+    so the following image requests are served from disk.
 
-@router.get("/video/{video_asset_id}/{title}")
-@router.get("/video/{video_asset_id}")
+    `accept` should be the Accept header the client sends for images, the
+    WebP/AVIF variants are only reported and warmed when it lists them.
+    """
+    paths = {"/" + item.file_path.lstrip("/") for item in data.images}
+    stmt = select(Image).where(Image.file_path.in_(paths))
+    images = {img.file_path: img for img in (await db.execute(stmt)).scalars()}
+
+    results = []
+    for item in data.images:
+        image_path = item.file_path.lstrip("/")
+        folder, bucket, _, _ = _resolve_image_folder(item.size, image_path, data.accept)
+        is_cached = image_exists(folder, image_path)
+        if data.warm and not is_cached:
+            enqueue_image_prefetch(image_path, folder)
+
+        img = images.get(f"/{image_path}")
+        width, height = (img.width, img.height) if img else (None, None)
+        if bucket and width and height:
+            width, height = fit_long_side(width, height, bucket)
+
+        results.append(ImageBatchItemOut(
+            file_path=item.file_path,
+            size=item.size,
+            # Path only, with the root path and router prefix, so it works behind a proxy
+            url=request.url_for("get_image", size=item.size, image_path=image_path).path,
+            is_cached=is_cached,
+            width=width,
+            height=height,
+            placeholder=img.placeholder if img else None
+        ))
+
+    return ImageBatchOut(images=results)
+
+
+# HEAD lets players check the size and range support before streaming
+@router.api_route("/video/{video_asset_id}/{title}", methods=["GET", "HEAD"])
+@router.api_route("/video/{video_asset_id}", methods=["GET", "HEAD"])
 async def stream_video(
     video_asset_id: int, 
     request: Request, 
     title: str = None,  # Not used here, players/browsers pick it up from the url
     db: AsyncSession = Depends(get_db)
 ):
-    # 1. Fetch the file path from the database
-    stmt = select(VideoAsset.file_path).where(VideoAsset.video_asset_id == video_asset_id)
-    result = await db.execute(stmt)
-    video_path = result.scalar_one_or_none()
-
-    if not video_path:
-        raise HTTPException(status_code=404, detail="Video asset record not found")
-
-    # 2. Check if the physical file exists
-    if not os.path.exists(video_path):
-        raise HTTPException(status_code=404, detail="Video file missing on disk")
-
-    file_size = os.path.getsize(video_path)
-    range_header = request.headers.get("range")
+    asset = await resolve_video_asset(db, video_asset_id)
+    video_path = asset.file_path
+    stat_result = asset.stat_result
+
+    file_size = stat_result.st_size
+    etag = build_stat_etag(stat_result)
+    last_modified = format_last_modified(stat_result)
+
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers={"ETag": etag, "Last-Modified": last_modified})
+
+    # A stale If-Range means the client's partial copy is outdated, send everything
+    byte_ranges = None
+    if if_range_allows(request.headers, etag, last_modified):
+        byte_ranges = parse_byte_ranges(request.headers.get("range"), file_size)
+
+    return VideoFileResponse(
+        video_path,
+        file_size,
+        get_video_content_type(video_path),
+        ranges=byte_ranges,
+        headers={"ETag": etag, "Last-Modified": last_modified},
+    )
 
-    start = 0
-    end = file_size - 1
 
-    # Byte-range logic
-    if range_header:
-        units, _, value = range_header.partition("=")
-        if units == "bytes" and "," not in value:
-            start_str, _, end_str = value.partition("-")
-            
-            if start_str == "" and end_str:
-                length = int(end_str)
-                start = max(file_size - length, 0)
-            else:
-                start = int(start_str) if start_str else 0
-                if end_str:
-                    end = int(end_str)
-
-            if start < 0 or start > end or end >= file_size:
-                range_header = None
-
-    is_range = range_header is not None
-    chunk_size = end - start + 1
-
-    ext = os.path.splitext(video_path)[1].lower()
-    if ext == ".mkv":
-        content_type = "video/x-matroska"
-    elif ext == ".webm":
-        content_type = "video/webm"
-    else:
-        content_type = "video/mp4"
-
-    headers = {
-        "Accept-Ranges": "bytes",
-        "Content-Length": str(chunk_size),
-        "Content-Type": content_type
-    }
+@router.get("/video/{video_asset_id}/hls/playlist.m3u8")
+async def get_video_hls_playlist(
+    video_asset_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    HLS playlist whose segments are byte ranges of the original file, served
+    by the regular video endpoint. No transcoding is done, so this is only
+    available for fragmented MP4 files.
+    """
+    asset = await resolve_video_asset(db, video_asset_id)
+    index = await get_hls_index(video_asset_id, asset)
+    if index is None:
+        raise HTTPException(status_code=415, detail="Video container can't be segmented for HLS")
+
+    etag = build_stat_etag(asset.stat_result)
+    if is_not_modified(request.headers, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Relative to .../video/{id}/hls/playlist.m3u8, so it survives proxy prefixes
+    playlist = render_hls_playlist(index, segment_uri=f"../../{video_asset_id}")
+    return Response(
+        playlist,
+        media_type="application/vnd.apple.mpegurl",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
 
-    if is_range:
-        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
 
-    if request.method == "HEAD":
-        return Response(status_code=206 if is_range else 200, headers=headers)
+@router.post("/video_assets/sync", response_model=VideoSyncJobOut, status_code=202)
+async def synchronize_video_assets_relationships_with_titles(
+    resume: bool = Query(False, description="Skip the folders an interrupted previous sync already finished"),
+):
+    # Runs in the background, large libraries would outlast proxy timeouts
+    job = start_sync_job(resume=resume)
+    return job.snapshot()
 
-    # Helper generator to stream the file
-    def iter_file():
-        with open(video_path, "rb") as f:
-            f.seek(start)
-            remaining = chunk_size
-            while remaining > 0:
-                data = f.read(min(1024 * 1024, remaining))
-                if not data:
-                    break
-                remaining -= len(data)
-                yield data
+@router.get("/video_assets/sync/{job_id}", response_model=VideoSyncJobOut)
+async def get_video_asset_sync_job(job_id: str):
+    return _get_sync_job_or_404(job_id).snapshot()
 
+@router.get("/video_assets/sync/{job_id}/events")
+async def stream_video_asset_sync_progress(job_id: str):
+    job = _get_sync_job_or_404(job_id)
     return StreamingResponse(
-        iter_file(),
-        status_code=206 if is_range else 200,
-        headers=headers,
+        iter_sync_events(job),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-
-@router.post("/video_assets/sync")
-async def synchronize_video_assets_relationships_with_titles(
-    db: AsyncSession = Depends(get_db),
-):
-    details = await sync_all_video_assets(db)
-    return {
-        "message": "Sync completed successfully.",
-        "details": details
-    }
+@router.post("/video_assets/sync/{job_id}/cancel", response_model=VideoSyncJobOut)
+async def cancel_video_asset_sync_job(job_id: str):
+    job = _get_sync_job_or_404(job_id)
+    await cancel_sync_job(job)
+    return job.snapshot()
+
+def _get_sync_job_or_404(job_id: str) -> SyncJob:
+    job = get_sync_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
 
 @router.get("/video_assets/title_folders", response_model=TitleFoldersResponseOut)
 async def get_list_of_video_asset_title_folders(
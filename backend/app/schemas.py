@@ -93,6 +93,7 @@ class ImageOut(BaseModel):
     iso_639_1: Optional[str] = None
     vote_average: Optional[float] = None
     vote_count: Optional[int] = None
+    placeholder: Optional[str] = None
     is_default: bool
     is_user_choice: bool
 
@@ -121,6 +122,30 @@ class ImagePreferenceIn(BaseModel):
     image_path: Optional[str] = None
 
 
+class ImageBatchItemIn(BaseModel):
+    file_path: str
+    size: str
+
+class ImageBatchIn(BaseModel):
+    images: List[ImageBatchItemIn] = Field(..., max_length=500)
+    warm: bool = False  # Queue missing images for background download
+    # Accept header the client's image requests send, e.g. "image/avif,image/webp,*/*".
+    # This request's own Accept is for JSON and says nothing about image formats.
+    accept: Optional[str] = None
+
+class ImageBatchItemOut(BaseModel):
+    file_path: str
+    size: str
+    url: str
+    is_cached: bool
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: Optional[str] = None
+
+class ImageBatchOut(BaseModel):
+    images: List[ImageBatchItemOut]
+
+
 class VideoAssetOut(BaseModel):
     video_asset_id: int
     file_name: str
@@ -245,6 +270,10 @@ class TitleCardOut(BaseModel):
     default_backdrop_image_path: Optional[str] = None
     default_logo_image_path: Optional[str] = None
 
+    # Previews of the poster and backdrop the card shows, user choice first
+    poster_placeholder: Optional[str] = None
+    backdrop_placeholder: Optional[str] = None
+
     user_details: Optional[TitleCardUserDetailsOut] = None
 
 
@@ -518,6 +547,21 @@ class TitleFoldersResponseOut(BaseModel):
     unlinked_folders: List[TitleFolderOut] = []
     counts: TitleFoldersResponseCountsOut
 
+class VideoSyncJobOut(BaseModel):
+    job_id: str
+    status: str # running, completed, cancelled or failed
+    stage: str # listing, scanning, pruning or linking
+    resumed_from: Optional[str] = None
+    folders_total: int
+    folders_scanned: int
+    folders_skipped: int
+    files_probed: int
+    rows_written: int
+    elapsed_seconds: float
+    eta_seconds: Optional[float] = None
+    metrics: Optional[dict] = None # Set once completed
+    error: Optional[str] = None
+
 
 ####### Configs #######
 
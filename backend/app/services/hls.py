@@ -0,0 +1,257 @@
+import os
+import math
+import struct
+import asyncio
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from app.services.video_streaming import CachedVideoAsset
+
+# Segments are cut at the first keyframe after this many seconds
+HLS_SEGMENT_SECONDS = float(os.getenv("HLS_SEGMENT_SECONDS", 6))
+
+SAMPLE_IS_NON_SYNC = 0x00010000
+
+
+@dataclass
+class HlsSegment:
+    offset: int
+    length: int
+    duration: float
+
+
+@dataclass
+class HlsIndex:
+    init_length: int
+    segments: List[HlsSegment] = field(default_factory=list)
+
+    @property
+    def target_duration(self) -> int:
+        return max((math.ceil(s.duration) for s in self.segments), default=1)
+
+
+# video_asset_id -> (mtime_ns, size, index). None marks files that can't be segmented.
+_hls_index_cache: Dict[int, Tuple[int, int, Optional[HlsIndex]]] = {}
+
+
+async def get_hls_index(video_asset_id: int, asset: CachedVideoAsset) -> Optional[HlsIndex]:
+    """
+    Returns the segment index for a video asset, probing the file once per
+    version. Only fragmented MP4 can be segmented without transcoding, for
+    anything else None is returned.
+    """
+    key = (asset.stat_result.st_mtime_ns, asset.stat_result.st_size)
+    cached = _hls_index_cache.get(video_asset_id)
+    if cached and cached[:2] == key:
+        return cached[2]
+
+    try:
+        index = await asyncio.to_thread(probe_hls_index, asset.file_path)
+    except (struct.error, OSError):
+        index = None
+    _hls_index_cache[video_asset_id] = (*key, index)
+    return index
+
+
+def render_hls_playlist(index: HlsIndex, segment_uri: str) -> str:
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{index.target_duration}",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        f'#EXT-X-MAP:URI="{segment_uri}",BYTERANGE="{index.init_length}@0"',
+    ]
+    for segment in index.segments:
+        lines.append(f"#EXTINF:{segment.duration:.3f},")
+        lines.append(f"#EXT-X-BYTERANGE:{segment.length}@{segment.offset}")
+        lines.append(segment_uri)
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+# --------- FRAGMENTED MP4 PROBING ---------
+
+def probe_hls_index(file_path: str, segment_seconds: float = HLS_SEGMENT_SECONDS) -> Optional[HlsIndex]:
+    """
+    Walks the MP4 box structure and groups `moof`+`mdat` fragments into
+    segments that start on a video keyframe. Only box headers and the small
+    `moov`/`moof` boxes are read, never the media data.
+    """
+    if os.path.splitext(file_path)[1].lower() != ".mp4":
+        return None
+
+    file_size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        top_level = list(_iter_boxes(f, 0, file_size))
+        moov = next((b for b in top_level if b[0] == b"moov"), None)
+        if not moov or not any(b[0] == b"moof" for b in top_level):
+            return None
+
+        track = _read_video_track(f, moov)
+        if not track:
+            return None
+        track_id, timescale, default_duration, default_flags = track
+
+        # (offset, end, duration in timescale units, starts on keyframe)
+        fragments = []
+        for i, (box_type, offset, size, header_size) in enumerate(top_level):
+            if box_type != b"moof":
+                continue
+            end = offset + size
+            for next_type, next_offset, next_size, _ in top_level[i + 1:]:
+                if next_type != b"mdat":
+                    break
+                end = next_offset + next_size
+
+            info = _read_fragment(f, offset, size, header_size, track_id, default_duration, default_flags)
+            if info is None:
+                continue
+            duration, is_sync = info
+            fragments.append((offset, end, duration, is_sync))
+
+    if not fragments:
+        return None
+
+    index = HlsIndex(init_length=fragments[0][0])
+    seg_start, seg_end, seg_duration = fragments[0][0], fragments[0][1], 0
+    for offset, end, duration, is_sync in fragments:
+        if seg_duration and is_sync and seg_duration / timescale >= segment_seconds:
+            index.segments.append(HlsSegment(seg_start, seg_end - seg_start, seg_duration / timescale))
+            seg_start, seg_duration = offset, 0
+        seg_end = end
+        seg_duration += duration
+    index.segments.append(HlsSegment(seg_start, seg_end - seg_start, seg_duration / timescale))
+
+    return index
+
+
+def _iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int, int]]:
+    """Yields (type, offset, size, header_size) for the boxes between start and end."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                return
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return
+        yield box_type, offset, size, header_size
+        offset += size
+
+
+def _read_payload(f: BinaryIO, box: Tuple[bytes, int, int, int]) -> bytes:
+    _, offset, size, header_size = box
+    f.seek(offset + header_size)
+    return f.read(size - header_size)
+
+
+def _find_child(f: BinaryIO, parent: Tuple[bytes, int, int, int], box_type: bytes):
+    _, offset, size, header_size = parent
+    return next((b for b in _iter_boxes(f, offset + header_size, offset + size) if b[0] == box_type), None)
+
+
+def _read_video_track(f: BinaryIO, moov) -> Optional[Tuple[int, int, int, int]]:
+    """Returns (track_id, timescale, default sample duration, default sample flags) of the first video track."""
+    _, moov_offset, moov_size, moov_header = moov
+    traks = [b for b in _iter_boxes(f, moov_offset + moov_header, moov_offset + moov_size) if b[0] == b"trak"]
+
+    for trak in traks:
+        tkhd = _find_child(f, trak, b"tkhd")
+        mdia = _find_child(f, trak, b"mdia")
+        if not tkhd or not mdia:
+            continue
+        hdlr = _find_child(f, mdia, b"hdlr")
+        mdhd = _find_child(f, mdia, b"mdhd")
+        if not hdlr or not mdhd or _read_payload(f, hdlr)[8:12] != b"vide":
+            continue
+
+        tkhd_data = _read_payload(f, tkhd)
+        track_id = struct.unpack(">I", tkhd_data[20:24] if tkhd_data[0] == 1 else tkhd_data[12:16])[0]
+        mdhd_data = _read_payload(f, mdhd)
+        timescale = struct.unpack(">I", mdhd_data[20:24] if mdhd_data[0] == 1 else mdhd_data[12:16])[0]
+
+        default_duration, default_flags = 0, 0
+        mvex = _find_child(f, moov, b"mvex")
+        if mvex:
+            _, mvex_offset, mvex_size, mvex_header = mvex
+            for trex in _iter_boxes(f, mvex_offset + mvex_header, mvex_offset + mvex_size):
+                if trex[0] != b"trex":
+                    continue
+                trex_data = _read_payload(f, trex)
+                if struct.unpack(">I", trex_data[4:8])[0] == track_id:
+                    default_duration, _, default_flags = struct.unpack(">III", trex_data[12:24])
+
+        return track_id, timescale or 1, default_duration, default_flags
+
+    return None
+
+
+def _read_fragment(
+    f: BinaryIO, offset: int, size: int, header_size: int,
+    track_id: int, default_duration: int, default_flags: int
+) -> Optional[Tuple[int, bool]]:
+    """Returns (duration, starts_on_keyframe) of the video track run in a `moof`."""
+    for traf in _iter_boxes(f, offset + header_size, offset + size):
+        if traf[0] != b"traf":
+            continue
+
+        tfhd = _find_child(f, traf, b"tfhd")
+        if not tfhd:
+            continue
+        tfhd_data = _read_payload(f, tfhd)
+        tfhd_flags = int.from_bytes(tfhd_data[1:4], "big")
+        if struct.unpack(">I", tfhd_data[4:8])[0] != track_id:
+            continue
+
+        pos = 8
+        if tfhd_flags & 0x01: pos += 8
+        if tfhd_flags & 0x02: pos += 4
+        traf_duration, traf_flags = default_duration, default_flags
+        if tfhd_flags & 0x08:
+            traf_duration = struct.unpack(">I", tfhd_data[pos:pos + 4])[0]
+            pos += 4
+        if tfhd_flags & 0x10: pos += 4
+        if tfhd_flags & 0x20:
+            traf_flags = struct.unpack(">I", tfhd_data[pos:pos + 4])[0]
+
+        duration = 0
+        first_flags = None
+        _, traf_offset, traf_size, traf_header = traf
+        for trun in _iter_boxes(f, traf_offset + traf_header, traf_offset + traf_size):
+            if trun[0] != b"trun":
+                continue
+            trun_data = _read_payload(f, trun)
+            trun_flags = int.from_bytes(trun_data[1:4], "big")
+            sample_count = struct.unpack(">I", trun_data[4:8])[0]
+
+            pos = 8
+            if trun_flags & 0x001: pos += 4
+            if trun_flags & 0x004:
+                if first_flags is None:
+                    first_flags = struct.unpack(">I", trun_data[pos:pos + 4])[0]
+                pos += 4
+
+            fields = [bit for bit in (0x100, 0x200, 0x400, 0x800) if trun_flags & bit]
+            entry_size = 4 * len(fields)
+            for i in range(sample_count):
+                entry = trun_data[pos + i * entry_size:pos + (i + 1) * entry_size]
+                values = dict(zip(fields, struct.unpack(f">{len(fields)}I", entry))) if fields else {}
+                duration += values.get(0x100, traf_duration)
+                if first_flags is None and i == 0:
+                    first_flags = values.get(0x400, traf_flags)
+
+        if first_flags is None:
+            first_flags = traf_flags
+        return duration, not (first_flags & SAMPLE_IS_NON_SYNC)
+
+    return None
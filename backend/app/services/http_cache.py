@@ -0,0 +1,70 @@
+import os
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from starlette.datastructures import Headers
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def build_stat_etag(stat_result: os.stat_result) -> str:
+    """Strong validator from the file's mtime and size."""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def build_content_etag(data_hash: str) -> str:
+    return f'"{data_hash}"'
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def format_last_modified(stat_result: os.stat_result) -> str:
+    return formatdate(stat_result.st_mtime, usegmt=True)
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(headers: Headers, etag: str, last_modified: Optional[str] = None) -> bool:
+    """
+    Evaluates If-None-Match (weak comparison) and, when that is absent,
+    If-Modified-Since. True means a 304 should be returned.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return any(_strip_weak(tag) == etag for tag in if_none_match.split(","))
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def if_range_allows(headers: Headers, etag: str, last_modified: Optional[str] = None) -> bool:
+    """
+    If-Range only permits a partial response when the validator still
+    matches (strong comparison). Otherwise the full entity must be sent.
+    """
+    if_range = headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith("W/"):
+        return False
+    if if_range.startswith('"'):
+        return if_range == etag
+    return last_modified is not None and if_range == last_modified
@@ -0,0 +1,329 @@
+import os
+import time
+import asyncio
+import contextlib
+import aiofiles
+import httpx
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from fastapi import HTTPException
+from app.services.http_cache import build_content_etag, hash_file
+from app.database import AsyncSessionLocal
+from app.services.image_processing import generate_derivatives, generate_placeholder, run_image_job, supported_formats
+from app.services.images import store_image_placeholder
+from app.services.image_storage import image_exists, local_image_path, mark_image_stored
+
+TMDB_IMAGE_BASE_PATH = "https://image.tmdb.org/t/p"
+
+BUCKETS = [400, 800, 1600]  # original handled separately
+
+# Limits for downloading originals from TMDB
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", 30))
+IMAGE_DOWNLOAD_MAX_BYTES = int(os.getenv("IMAGE_DOWNLOAD_MAX_BYTES", 50 * 1024 * 1024))
+IMAGE_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# When true the requested size is served first and the remaining sizes are
+# produced in one background pass. When false a single pass produces them all
+# before the response.
+IMAGE_BACKGROUND_DERIVATIVES = os.getenv("IMAGE_BACKGROUND_DERIVATIVES", "true").lower() in ("true", "1", "yes")
+
+# Modern formats offered to clients that list them in Accept, in order of
+# preference. Anything else gets the JPEG/PNG sizes.
+IMAGE_DERIVATIVE_FORMATS = [
+    fmt for fmt in (f.strip().lower() for f in os.getenv("IMAGE_DERIVATIVE_FORMATS", "webp").split(","))
+    if fmt in supported_formats()
+]
+FORMAT_MEDIA_TYPES = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+http_client = httpx.AsyncClient(timeout=httpx.Timeout(IMAGE_DOWNLOAD_TIMEOUT, connect=10))
+
+# (folder, image_path) -> task currently producing that file
+_inflight_images: Dict[Tuple[str, str], asyncio.Future] = {}
+
+# Originals only downloaded so far. They wait at their raw path until the
+# progressive re-encode is written, so a stored original is never replaced
+# while it's being served.
+_raw_originals: Set[str] = set()
+
+IMAGE_ETAG_CACHE_SIZE = 50_000
+_image_etags: Dict[Tuple[str, int, int], str] = {}
+
+
+def pick_bucket(long_side: int):
+    for b in BUCKETS:
+        if long_side <= b:
+            return b
+    return None
+
+
+def negotiate_image_format(accept: Optional[str]) -> Optional[str]:
+    """
+    Picks the first enabled format the Accept header explicitly allows.
+    Wildcards don't count, browsers send */* without decoding everything.
+    """
+    if not accept or not IMAGE_DERIVATIVE_FORMATS:
+        return None
+
+    accepted = {}
+    for part in accept.split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[media_type.lower()] = quality
+
+    for fmt in IMAGE_DERIVATIVE_FORMATS:
+        if accepted.get(FORMAT_MEDIA_TYPES[fmt], 0) > 0:
+            return fmt
+    return None
+
+
+def bucket_folder(bucket: int, fmt: Optional[str] = None) -> str:
+    return f"{bucket}-{fmt}" if fmt else str(bucket)
+
+
+def _parse_bucket_folder(folder: str) -> Tuple[int, Optional[str]]:
+    bucket, _, fmt = folder.partition("-")
+    return int(bucket), fmt or None
+
+
+async def ensure_image(image_path: str, folder: str, other_sizes: bool = True) -> Dict[str, float]:
+    """
+    Makes sure `folder` ("original" or a bucket folder) holds the image,
+    downloading and resizing on a miss. Only one job runs per file, concurrent callers
+    await the same task. Returns the stage timings of the work done.
+
+    A requested size also produces the other sizes of its format, unless
+    `other_sizes` is false. Originals never do, they say nothing about the
+    format the client will ask for.
+    """
+    if image_exists(folder, image_path):
+        return {}
+
+    other_sizes = other_sizes and folder != "original"
+    task = _inflight_images.get((folder, image_path))
+    if task is None:
+        targets = {folder: local_image_path(folder, image_path)}
+        if other_sizes and not IMAGE_BACKGROUND_DERIVATIVES:
+            targets.update(_missing_derivatives(image_path, _folder_format(folder)))
+        task = _start_single_flight(
+            [(f, image_path) for f in targets],
+            lambda: _store_derivatives(image_path, targets, schedule_remaining=other_sizes)
+        )
+
+    # Shielded so a disconnecting client doesn't cancel the work for the rest
+    return await asyncio.shield(task)
+
+
+async def image_etag(local_file_path: str, stat_result: os.stat_result) -> str:
+    """Content hash of a stored image, memoized per file version."""
+    key = (local_file_path, stat_result.st_mtime_ns, stat_result.st_size)
+    etag = _image_etags.get(key)
+    if etag is None:
+        etag = build_content_etag(await asyncio.to_thread(hash_file, local_file_path))
+        if len(_image_etags) >= IMAGE_ETAG_CACHE_SIZE:
+            _image_etags.pop(next(iter(_image_etags)))
+        _image_etags[key] = etag
+    return etag
+
+
+def evict_image(folder: str, image_path: str) -> bool:
+    """Removes a stored file unless a job is currently producing it."""
+    if (folder, image_path) in _inflight_images:
+        return False
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(local_image_path(folder, image_path))
+    return True
+
+
+# --------- SINGLE FLIGHT ---------
+
+def _start_single_flight(keys: Iterable[Tuple[str, str]], job: Callable[[], Awaitable[Dict[str, float]]]) -> asyncio.Future:
+    keys = list(keys)
+    task = asyncio.ensure_future(job())
+    for key in keys:
+        _inflight_images[key] = task
+
+    def _release(_):
+        for key in keys:
+            if _inflight_images.get(key) is task:
+                _inflight_images.pop(key)
+
+    task.add_done_callback(_release)
+    return task
+
+
+async def _run_single_flight(key: Tuple[str, str], job: Callable[[], Awaitable[Dict[str, float]]]) -> Dict[str, float]:
+    task = _inflight_images.get(key) or _start_single_flight([key], job)
+    return await asyncio.shield(task)
+
+
+# --------- DERIVATIVES ---------
+
+def _folder_format(folder: str) -> Optional[str]:
+    return None if folder == "original" else _parse_bucket_folder(folder)[1]
+
+
+def _missing_derivatives(image_path: str, fmt: Optional[str] = None) -> Dict[str, str]:
+    """
+    Files of an image that don't exist yet and that no running job is
+    producing. Only sizes in `fmt` are considered, clients stick to one.
+    """
+    targets = {}
+    if not image_exists("original", image_path) and ("original", image_path) not in _inflight_images:
+        targets["original"] = local_image_path("original", image_path)
+
+    for bucket in BUCKETS:
+        folder = bucket_folder(bucket, fmt)
+        if (folder, image_path) not in _inflight_images and not image_exists(folder, image_path):
+            targets[folder] = local_image_path(folder, image_path)
+
+    return targets
+
+
+async def _store_derivatives(image_path: str, targets: Dict[str, str], schedule_remaining: bool = True) -> Dict[str, float]:
+    """Decodes the original once and writes every target from it."""
+    timings = {}
+    formats = {_folder_format(folder) for folder in targets if folder != "original"}
+    if not image_exists("original", image_path) and image_path not in _raw_originals:
+        timings = await _run_single_flight(("download", image_path), lambda: _download_original_timed(image_path))
+
+    # Another job may have finished some of these in the meantime
+    targets = {folder: path for folder, path in targets.items() if not image_exists(folder, image_path)}
+
+    if targets:
+        source_path = _original_source_path(image_path)
+        bucket_targets = [
+            (*_parse_bucket_folder(folder), path) for folder, path in targets.items() if folder != "original"
+        ]
+        timings = {
+            **timings,
+            **await run_image_job(generate_derivatives, source_path, bucket_targets, targets.get("original"))
+        }
+        for folder in targets:
+            mark_image_stored(folder, image_path)
+        if "original" in targets and image_path in _raw_originals:
+            _raw_originals.discard(image_path)
+            _remove_raw_original(image_path)
+
+    if IMAGE_BACKGROUND_DERIVATIVES and schedule_remaining:
+        _schedule_remaining_derivatives(image_path, formats.pop() if len(formats) == 1 else None)
+
+    return timings
+
+
+def _schedule_remaining_derivatives(image_path: str, fmt: Optional[str] = None):
+    targets = _missing_derivatives(image_path, fmt)
+    if targets:
+        _start_single_flight(
+            [(folder, image_path) for folder in targets],
+            lambda: _store_derivatives_in_background(image_path, targets)
+        )
+
+
+async def _store_derivatives_in_background(image_path: str, targets: Dict[str, str]) -> Dict[str, float]:
+    try:
+        return await _store_derivatives(image_path, targets, schedule_remaining=False)
+    except Exception as e:
+        print(f"[Warning] Generating image sizes for '{image_path}' failed: {e!r}")
+        return {}
+
+
+# --------- DOWNLOADING ---------
+
+def _raw_original_path(image_path: str) -> str:
+    # The .part suffix keeps it out of storage scans and the quota
+    return local_image_path("original", image_path) + ".raw.part"
+
+
+def _original_source_path(image_path: str) -> str:
+    if image_path in _raw_originals:
+        return _raw_original_path(image_path)
+    return local_image_path("original", image_path)
+
+
+def _remove_raw_original(image_path: str):
+    """Deletes the raw download once the jobs that may still be reading it have finished."""
+    current = asyncio.current_task()
+    readers = [task for (_, path), task in _inflight_images.items() if path == image_path and task is not current]
+
+    async def remove() -> Dict[str, float]:
+        await asyncio.gather(*readers, return_exceptions=True)
+        # A new download may have started after the stored original was evicted
+        if image_path not in _raw_originals:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(_raw_original_path(image_path))
+        return {}
+
+    _start_single_flight([("raw", image_path)], remove)
+
+
+async def _download_original_timed(image_path: str) -> Dict[str, float]:
+    start = time.perf_counter()
+    if image_path.lower().endswith(".svg"):
+        # SVGs are stored as downloaded, there's nothing to re-encode
+        await _download_original(image_path, local_image_path("original", image_path))
+        mark_image_stored("original", image_path)
+        return {"download": (time.perf_counter() - start) * 1000}
+
+    local_path = _raw_original_path(image_path)
+    await _download_original(image_path, local_path)
+    _raw_originals.add(image_path)
+    # Kept off the response path, and registered like any other job reading
+    # the raw download so it isn't deleted underneath
+    _start_single_flight([("placeholder", image_path)], lambda: _store_placeholder(image_path, local_path))
+    return {"download": (time.perf_counter() - start) * 1000}
+
+
+async def _store_placeholder(image_path: str, local_path: str) -> Dict[str, float]:
+    """Previews are a nice to have, failing to make one mustn't fail the image."""
+    try:
+        placeholder = await run_image_job(generate_placeholder, local_path)
+        if placeholder:
+            async with AsyncSessionLocal() as db:
+                await store_image_placeholder(db, f"/{image_path}", placeholder)
+    except Exception as e:
+        print(f"[Warning] Storing a placeholder for '{image_path}' failed: {e!r}")
+    return {}
+
+
+async def _download_original(image_path: str, local_path: str):
+    """
+    Streams the original from TMDB into a temp file and renames it into place.
+    Nothing is buffered in memory, and the transfer is capped by
+    IMAGE_DOWNLOAD_MAX_BYTES and IMAGE_DOWNLOAD_TIMEOUT.
+    """
+    url = f"{TMDB_IMAGE_BASE_PATH}/original/{image_path}"
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    temp_path = f"{local_path}.{os.getpid()}.part"
+
+    try:
+        async with asyncio.timeout(IMAGE_DOWNLOAD_TIMEOUT):
+            async with http_client.stream("GET", url) as resp:
+                if resp.status_code != 200:
+                    raise HTTPException(status_code=resp.status_code, detail="Image not found")
+
+                if int(resp.headers.get("Content-Length") or 0) > IMAGE_DOWNLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=502, detail="Image exceeds the download size limit")
+
+                received = 0
+                async with aiofiles.open(temp_path, "wb") as f:
+                    async for chunk in resp.aiter_bytes(IMAGE_DOWNLOAD_CHUNK_SIZE):
+                        received += len(chunk)
+                        if received > IMAGE_DOWNLOAD_MAX_BYTES:
+                            raise HTTPException(status_code=502, detail="Image exceeds the download size limit")
+                        await f.write(chunk)
+
+        os.replace(temp_path, local_path)
+    except (TimeoutError, httpx.TimeoutException):
+        raise HTTPException(status_code=504, detail="Timed out downloading image from TMDB")
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
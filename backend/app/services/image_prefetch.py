@@ -0,0 +1,96 @@
+import os
+import asyncio
+from typing import List, Optional, Set, Tuple
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Episode, Season, SeasonTranslation, TitleTranslation
+from app.services.image_cache import IMAGE_DERIVATIVE_FORMATS, bucket_folder, ensure_image
+from app.services.image_storage import image_exists
+
+# Downloads running at once, and queued images beyond which new ones are dropped
+IMAGE_PREFETCH_CONCURRENCY = int(os.getenv("IMAGE_PREFETCH_CONCURRENCY", 4))
+IMAGE_PREFETCH_QUEUE_SIZE = int(os.getenv("IMAGE_PREFETCH_QUEUE_SIZE", 2000))
+
+# Folders the title page requests for each kind of art, see frontend/src/utils/imagePath.js
+PREFETCH_SIZED_BUCKET = 800
+PREFETCH_ORIGINAL = "original"
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_queued: Set[Tuple[str, str]] = set()
+
+
+def enqueue_image_prefetch(image_path: str, folder: str):
+    """Queues an image for background download unless it's stored or already waiting."""
+    image_path = image_path.lstrip("/")
+    key = (folder, image_path)
+    if key in _queued or image_exists(folder, image_path):
+        return
+
+    _ensure_workers()
+    try:
+        _queue.put_nowait(key)
+        _queued.add(key)
+    except asyncio.QueueFull:
+        pass
+
+
+async def prefetch_title_images(db: AsyncSession, title_id: int):
+    """
+    Queues the default poster, backdrop and logo of a title together with
+    its season posters and episode stills, in the sizes the title page asks
+    for, so the first visit doesn't wait on TMDB.
+    """
+    # Browsers that accept modern formats get the first enabled one
+    sized_folder = bucket_folder(PREFETCH_SIZED_BUCKET, IMAGE_DERIVATIVE_FORMATS[0] if IMAGE_DERIVATIVE_FORMATS else None)
+
+    sized_stmt = union(
+        select(TitleTranslation.default_poster_image_path).where(TitleTranslation.title_id == title_id),
+        select(SeasonTranslation.default_poster_image_path)
+            .join(Season, Season.season_id == SeasonTranslation.season_id)
+            .where(Season.title_id == title_id),
+        select(Episode.default_backdrop_image_path).where(Episode.title_id == title_id),
+    )
+    original_stmt = union(
+        select(TitleTranslation.default_backdrop_image_path).where(TitleTranslation.title_id == title_id),
+        select(TitleTranslation.default_logo_image_path).where(TitleTranslation.title_id == title_id),
+    )
+
+    for stmt, folder in ((original_stmt, PREFETCH_ORIGINAL), (sized_stmt, sized_folder)):
+        for image_path in (await db.execute(stmt)).scalars():
+            if not image_path:
+                continue
+            # SVG logos are only ever stored as originals
+            enqueue_image_prefetch(image_path, PREFETCH_ORIGINAL if image_path.lower().endswith(".svg") else folder)
+
+
+async def stop_image_prefetch():
+    global _queue
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queued.clear()
+    _queue = None
+
+
+def _ensure_workers():
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=IMAGE_PREFETCH_QUEUE_SIZE)
+    while len(_workers) < max(IMAGE_PREFETCH_CONCURRENCY, 1):
+        _workers.append(asyncio.create_task(_prefetch_worker(_queue)))
+
+
+async def _prefetch_worker(queue: asyncio.Queue):
+    while True:
+        folder, image_path = await queue.get()
+        try:
+            # Only the file the page will ask for. Derivative jobs aren't bounded
+            # by the workers and would queue ahead of interactive misses.
+            await ensure_image(image_path, folder, other_sizes=False)
+        except Exception as e:
+            print(f"[Warning] Prefetching image '{image_path}' failed: {e!r}")
+        finally:
+            _queued.discard((folder, image_path))
+            queue.task_done()
@@ -0,0 +1,150 @@
+import io
+import os
+import time
+import base64
+import shutil
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from PIL import Image, features
+from app.services.process_pool import LazyProcessPool
+
+# Pillow work runs in its own processes so resizes don't contend on the GIL
+# or on the default executor that Starlette uses for sync iterators
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Long side of the inline previews stored with image metadata
+PLACEHOLDER_SIZE = 16
+
+_pool = LazyProcessPool(IMAGE_PROCESS_WORKERS)
+
+T = TypeVar("T")
+
+
+def shutdown_image_pool():
+    _pool.shutdown()
+
+
+async def run_image_job(func: Callable[..., T], *args) -> T:
+    """Runs one of the image functions below in the pool and returns its result."""
+    return await _pool.run(func, *args)
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+
+
+def _has_transparency(img: Image.Image) -> bool:
+    return img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def fit_long_side(width: int, height: int, long_side: int) -> Tuple[int, int]:
+    if width >= height:
+        return long_side, int(height * (long_side / width))
+    return int(width * (long_side / height)), long_side
+
+
+def _save_atomic(img: Image.Image, target_path: str, transparent: bool, quality: int, fmt: Optional[str] = None):
+    temp_path = target_path + ".part"
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+    if fmt == "webp":
+        # Lossy WebP keeps the alpha channel, so logos don't need PNG
+        img.save(temp_path, "WEBP", quality=quality, method=4)
+    elif fmt == "avif":
+        img.save(temp_path, "AVIF", quality=quality - 20, speed=8)
+    elif transparent:
+        # Keep as PNG to preserve transparency
+        img.save(temp_path, "PNG", optimize=True)
+    else:
+        # Convert to RGB and save as progressive JPEG
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.save(temp_path, "JPEG", progressive=True, quality=quality)
+
+    # Write aside and rename so readers never see a half written file
+    os.replace(temp_path, target_path)
+
+
+def supported_formats() -> List[str]:
+    return [fmt for fmt in ("webp", "avif") if features.check(fmt)]
+
+
+def generate_derivatives(
+    source_path: str,
+    targets: List[Tuple[int, Optional[str], str]],
+    original_target: Optional[str] = None
+) -> Dict[str, float]:
+    """
+    Decodes the source once and writes every (long side, format, path) target
+    from it, largest first so each resize starts from the previous, smaller
+    result. A format of None means progressive JPEG, or PNG for transparency.
+
+    When the original doesn't need re-encoding, JPEGs are decoded in draft
+    mode, letting libjpeg skip straight to the nearest 1/2, 1/4 or 1/8 scale
+    above the largest target.
+    """
+    timings = {"decode": 0.0, "resize": 0.0, "encode": 0.0}
+
+    if source_path.lower().endswith(".svg"):
+        for _, _, target_path in targets:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copy2(source_path, target_path + ".part")
+            os.replace(target_path + ".part", target_path)
+        return {}
+
+    with Image.open(source_path) as img:
+        width, height = img.size
+        sizes = {long_side: fit_long_side(width, height, long_side) for long_side, _, _ in targets}
+        transparent = _has_transparency(img)
+
+        start = time.perf_counter()
+        if original_target is None and sizes:
+            img.draft(None, max(sizes.values()))
+        img.load()
+        timings["decode"] += _elapsed_ms(start)
+
+        if original_target:
+            start = time.perf_counter()
+            _save_atomic(img, original_target, transparent, quality=95)
+            timings["encode"] += _elapsed_ms(start)
+
+        current = img
+        for long_side, fmt, target_path in sorted(targets, key=lambda t: t[0], reverse=True):
+            if current.size != sizes[long_side]:
+                start = time.perf_counter()
+                current = current.resize(sizes[long_side], Image.LANCZOS, reducing_gap=3.0)
+                timings["resize"] += _elapsed_ms(start)
+
+            start = time.perf_counter()
+            _save_atomic(current, target_path, transparent, quality=85, fmt=fmt)
+            timings["encode"] += _elapsed_ms(start)
+
+    return timings
+
+
+def generate_placeholder(source_path: str) -> Optional[str]:
+    """
+    Shrinks the image to PLACEHOLDER_SIZE pixels and returns it as a data
+    URI of a couple hundred bytes that the frontend can blur up while the
+    real image loads. JPEGs are decoded straight at 1/8 scale.
+    """
+    if source_path.lower().endswith(".svg"):
+        return None
+
+    with Image.open(source_path) as img:
+        img.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if _has_transparency(img) else "RGB")
+
+        buffer = io.BytesIO()
+        if features.check("webp"):
+            img.save(buffer, "WEBP", quality=50)
+            media_type = "image/webp"
+        else:
+            img.save(buffer, "PNG", optimize=True)
+            media_type = "image/png"
+
+    return f"data:{media_type};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
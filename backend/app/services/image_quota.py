@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.models import (
+    Episode, SeasonTranslation, SeasonUserDetails, TitleTranslation, TitleUserDetails,
+    TMDBCollectionTranslation, TMDBCollectionUserDetails
+)
+from app.services.image_cache import evict_image
+from app.services.image_storage import LOCAL_IMAGE_BASE_PATH, iter_stored_images, take_stored_bytes
+
+# Disk budget for IMAGE_STORAGE_PATH in bytes, 0 disables eviction
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 0))
+
+# Seconds between quota checks
+IMAGE_CACHE_CHECK_INTERVAL = float(os.getenv("IMAGE_CACHE_CHECK_INTERVAL", 600))
+
+# Eviction stops once usage is below this share of the quota, so one new
+# image doesn't trigger another full pass right away
+IMAGE_CACHE_LOW_WATERMARK = 0.9
+
+ACCESS_INDEX_PATH = os.path.join(LOCAL_IMAGE_BASE_PATH, ".access-index.json")
+
+# Every column that points at art the UI shows by default or a user picked
+PROTECTED_IMAGE_COLUMNS = [
+    TitleTranslation.default_poster_image_path,
+    TitleTranslation.default_backdrop_image_path,
+    TitleTranslation.default_logo_image_path,
+    SeasonTranslation.default_poster_image_path,
+    Episode.default_backdrop_image_path,
+    TMDBCollectionTranslation.default_poster_image_path,
+    TMDBCollectionTranslation.default_backdrop_image_path,
+    TitleUserDetails.chosen_poster_image_path,
+    TitleUserDetails.chosen_backdrop_image_path,
+    TitleUserDetails.chosen_logo_image_path,
+    SeasonUserDetails.chosen_poster_image_path,
+    TMDBCollectionUserDetails.chosen_poster_image_path,
+    TMDBCollectionUserDetails.chosen_backdrop_image_path,
+]
+
+
+@dataclass
+class StoredImage:
+    folder: str
+    image_path: str
+    local_path: str
+    size: int
+    last_access: float
+
+
+# Path relative to LOCAL_IMAGE_BASE_PATH -> unix time it was last served.
+# Kept in memory and flushed to ACCESS_INDEX_PATH on every quota check, as
+# touching the files themselves would change their Last-Modified.
+_last_access: Dict[str, float] = {}
+
+# Usage after the last full scan plus everything stored since, None until
+# the first scan. Only when it passes the quota is the storage walked again.
+_estimated_bytes: Optional[int] = None
+
+
+def record_image_access(local_file_path: str):
+    if not IMAGE_CACHE_MAX_BYTES:
+        return
+    _last_access[os.path.relpath(local_file_path, LOCAL_IMAGE_BASE_PATH)] = time.time()
+
+
+def load_access_index():
+    try:
+        with open(ACCESS_INDEX_PATH) as f:
+            _last_access.update(json.load(f))
+    except (FileNotFoundError, ValueError):
+        pass
+
+
+def save_access_index():
+    os.makedirs(LOCAL_IMAGE_BASE_PATH, exist_ok=True)
+    temp_path = ACCESS_INDEX_PATH + ".part"
+    with open(temp_path, "w") as f:
+        json.dump(_last_access, f)
+    os.replace(temp_path, ACCESS_INDEX_PATH)
+
+
+async def enforce_image_quota(db: AsyncSession) -> Dict[str, int]:
+    """
+    Evicts least recently served images until the storage is back under
+    IMAGE_CACHE_LOW_WATERMARK of the quota. Resized derivatives go first and
+    originals last, and nothing that is currently someone's default or chosen
+    art is ever removed.
+    """
+    global _estimated_bytes
+    metrics = {"total_bytes": 0, "evicted_files": 0, "evicted_bytes": 0}
+    if not IMAGE_CACHE_MAX_BYTES:
+        return metrics
+
+    stored_bytes = take_stored_bytes()
+    if _estimated_bytes is not None:
+        _estimated_bytes += stored_bytes
+        if _estimated_bytes <= IMAGE_CACHE_MAX_BYTES:
+            metrics["total_bytes"] = _estimated_bytes
+            return metrics
+
+    stored = await asyncio.to_thread(_scan_stored_images)
+    total_bytes = _estimated_bytes = sum(image.size for image in stored)
+    metrics["total_bytes"] = total_bytes
+    if total_bytes <= IMAGE_CACHE_MAX_BYTES:
+        return metrics
+
+    protected = await _load_protected_image_paths(db)
+    target_bytes = IMAGE_CACHE_MAX_BYTES * IMAGE_CACHE_LOW_WATERMARK
+
+    # Derivatives can be re-made from the original, originals need a download
+    candidates = sorted(stored, key=lambda image: (image.folder == "original", image.last_access))
+    for image in candidates:
+        if total_bytes <= target_bytes:
+            break
+        if image.image_path in protected or not evict_image(image.folder, image.image_path):
+            continue
+
+        _last_access.pop(os.path.relpath(image.local_path, LOCAL_IMAGE_BASE_PATH), None)
+
+        total_bytes -= image.size
+        metrics["evicted_files"] += 1
+        metrics["evicted_bytes"] += image.size
+
+    metrics["total_bytes"] = _estimated_bytes = total_bytes
+    return metrics
+
+
+async def run_image_quota_loop():
+    """Background task started from the app lifespan, does nothing without a quota."""
+    if not IMAGE_CACHE_MAX_BYTES:
+        return
+
+    load_access_index()
+    try:
+        while True:
+            await asyncio.sleep(IMAGE_CACHE_CHECK_INTERVAL)
+            try:
+                async with AsyncSessionLocal() as db:
+                    metrics = await enforce_image_quota(db)
+                if metrics["evicted_files"]:
+                    print(f"[Info] Evicted {metrics['evicted_files']} images ({metrics['evicted_bytes']} bytes) from the image cache")
+                await asyncio.to_thread(save_access_index)
+            except Exception as e:
+                print(f"[Warning] Image cache quota check failed: {e!r}")
+    finally:
+        save_access_index()
+
+
+async def _load_protected_image_paths(db: AsyncSession) -> Set[str]:
+    stmt = union(*(select(column).where(column.is_not(None)) for column in PROTECTED_IMAGE_COLUMNS))
+    # Stored paths start with a slash, the files on disk don't
+    return {path.lstrip("/") for path in (await db.execute(stmt)).scalars()}
+
+
+def _scan_stored_images() -> List[StoredImage]:
+    stored = []
+    for folder, image_path, local_path in iter_stored_images():
+        try:
+            stat_result = os.stat(local_path)
+        except FileNotFoundError:
+            continue
+        stored.append(StoredImage(
+            folder=folder,
+            image_path=image_path,
+            local_path=local_path,
+            size=stat_result.st_size,
+            # Files never served since tracking started fall back to their creation time
+            last_access=_last_access.get(os.path.relpath(local_path, LOCAL_IMAGE_BASE_PATH), stat_result.st_mtime),
+        ))
+    return stored
@@ -0,0 +1,158 @@
+import os
+import sys
+import math
+import contextlib
+import hashlib
+import threading
+from typing import Iterator, Optional, Tuple
+
+LOCAL_IMAGE_BASE_PATH = os.environ["IMAGE_STORAGE_PATH"]
+
+# Stored files the presence filter is sized for, past this its false
+# positive rate climbs and more lookups fall through to the filesystem
+IMAGE_PRESENCE_FILTER_CAPACITY = int(os.getenv("IMAGE_PRESENCE_FILTER_CAPACITY", 4_000_000))
+IMAGE_PRESENCE_FILTER_ERROR_RATE = 0.01
+
+
+def shard_dirs(image_path: str) -> str:
+    """Two levels of 256 directories picked by a hash of the TMDB path."""
+    digest = hashlib.blake2b(image_path.encode(), digest_size=2).hexdigest()
+    return os.path.join(digest[:2], digest[2:])
+
+
+def local_image_path(folder: str, image_path: str) -> str:
+    return os.path.join(LOCAL_IMAGE_BASE_PATH, folder, shard_dirs(image_path), image_path)
+
+
+class PresenceFilter:
+    """
+    Bloom filter over (folder, image_path). A miss means the file certainly
+    isn't stored, a hit means it probably is. Evicted files can't be removed,
+    they simply turn into false positives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.lock = threading.Lock()
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        with self.lock:
+            for pos in self._positions(key):
+                self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# Ready filter, None until the startup scan has finished
+_presence: Optional[PresenceFilter] = None
+# Filter being filled by the startup scan, also receives new files meanwhile
+_building: Optional[PresenceFilter] = None
+
+
+# Bytes of files stored since the last take_stored_bytes(), lets the quota
+# check skip walking the storage while usage is clearly below the limit
+_stored_bytes = 0
+
+
+def _presence_key(folder: str, image_path: str) -> str:
+    return f"{folder}/{image_path}"
+
+
+def mark_image_stored(folder: str, image_path: str):
+    global _stored_bytes
+    key = _presence_key(folder, image_path)
+    for presence in (_presence, _building):
+        if presence is not None:
+            presence.add(key)
+    # Replaced files are counted again, which only overestimates usage
+    with contextlib.suppress(FileNotFoundError):
+        _stored_bytes += os.path.getsize(local_image_path(folder, image_path))
+
+
+def take_stored_bytes() -> int:
+    """Bytes stored since the previous call."""
+    global _stored_bytes
+    stored_bytes, _stored_bytes = _stored_bytes, 0
+    return stored_bytes
+
+
+def image_may_exist(folder: str, image_path: str) -> bool:
+    """Cheap check for the serving path, a True still has to be confirmed by opening the file."""
+    if _presence is None:
+        return os.path.exists(local_image_path(folder, image_path))
+    return _presence_key(folder, image_path) in _presence
+
+
+def image_exists(folder: str, image_path: str) -> bool:
+    """Only files the filter can't rule out touch the filesystem."""
+    return image_may_exist(folder, image_path) and (
+        _presence is None or os.path.exists(local_image_path(folder, image_path))
+    )
+
+
+def load_presence_filter():
+    """Scans the storage once and switches lookups over to the filter. Runs in a thread."""
+    global _presence, _building
+    _building = PresenceFilter(IMAGE_PRESENCE_FILTER_CAPACITY, IMAGE_PRESENCE_FILTER_ERROR_RATE)
+    for folder, image_path, _ in iter_stored_images():
+        _building.add(_presence_key(folder, image_path))
+    _presence, _building = _building, None
+
+
+def iter_stored_images() -> Iterator[Tuple[str, str, str]]:
+    """Yields (folder, image_path, local_path) for every file in the sharded layout."""
+    for folder in _list_dirs(LOCAL_IMAGE_BASE_PATH):
+        folder_path = os.path.join(LOCAL_IMAGE_BASE_PATH, folder)
+        for shard in _list_dirs(folder_path):
+            for sub_shard in _list_dirs(os.path.join(folder_path, shard)):
+                shard_path = os.path.join(folder_path, shard, sub_shard)
+                for dir_path, _, file_names in os.walk(shard_path):
+                    for file_name in file_names:
+                        if file_name.endswith(".part"):
+                            continue
+                        local_path = os.path.join(dir_path, file_name)
+                        yield folder, os.path.relpath(local_path, shard_path), local_path
+
+
+def _list_dirs(path: str):
+    try:
+        with os.scandir(path) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+def migrate_flat_layout() -> int:
+    """
+    Moves images stored as `<folder>/<image_path>` into their shard
+    directories. Safe to run repeatedly, returns the number of files moved.
+    """
+    moved = 0
+    for folder in _list_dirs(LOCAL_IMAGE_BASE_PATH):
+        folder_path = os.path.join(LOCAL_IMAGE_BASE_PATH, folder)
+        with os.scandir(folder_path) as entries:
+            files = [entry.name for entry in entries if entry.is_file() and not entry.name.endswith(".part")]
+
+        for image_path in files:
+            target_path = local_image_path(folder, image_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(os.path.join(folder_path, image_path), target_path)
+            moved += 1
+
+    return moved
+
+
+if __name__ == "__main__":
+    # python -m app.services.image_storage migrate
+    if sys.argv[1:] != ["migrate"]:
+        sys.exit("Usage: python -m app.services.image_storage migrate")
+    print(f"Moved {migrate_flat_layout()} images into the sharded layout")
@@ -1,6 +1,6 @@
 from typing import List, Optional, Dict
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
 from app.services.languages import get_user_language_context
@@ -19,7 +19,8 @@ from app.models import (
 from app.schemas import (
     ImageListOut,
     ImageListsOut,
-    ImageOut
+    ImageOut,
+    TitleCardOut
 )
 
 
@@ -237,6 +238,7 @@ async def fetch_image_details(
             iso_639_1=img.iso_639_1,
             vote_average=float(img.vote_average) if img.vote_average else 0.0,
             vote_count=img.vote_count,
+            placeholder=img.placeholder,
             is_default=img.file_path in defaults,
             is_user_choice=img.file_path in user_choices
         )
@@ -354,3 +356,33 @@ async def set_user_image_choice(
         "image_path": image_path,
         "updated_field": target_col
     }
+
+
+async def store_image_placeholder(db: AsyncSession, file_path: str, placeholder: str):
+    await db.execute(update(Image).where(Image.file_path == file_path).values(placeholder=placeholder))
+    await db.commit()
+
+
+async def fill_title_placeholders(db: AsyncSession, titles: List[TitleCardOut]):
+    """Sets the poster and backdrop placeholders of title cards with one query."""
+    def shown_paths(title: TitleCardOut):
+        user_details = title.user_details
+        return (
+            (user_details and user_details.chosen_poster_image_path) or title.default_poster_image_path,
+            (user_details and user_details.chosen_backdrop_image_path) or title.default_backdrop_image_path,
+        )
+
+    paths = {path for title in titles for path in shown_paths(title) if path}
+    if not paths:
+        return
+
+    stmt = select(Image.file_path, Image.placeholder).where(
+        Image.file_path.in_(paths),
+        Image.placeholder.is_not(None)
+    )
+    placeholders = dict((await db.execute(stmt)).all())
+
+    for title in titles:
+        poster_path, backdrop_path = shown_paths(title)
+        title.poster_placeholder = placeholders.get(poster_path)
+        title.backdrop_placeholder = placeholders.get(backdrop_path)
@@ -0,0 +1,131 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+VIDEO_FILE_EXTENSIONS = ('.mkv', '.mp4', '.avi')
+
+# Title folders of one library walked at once. Network shares answer
+# directory listings slowly but in parallel, local disks barely care.
+VIDEO_SCAN_THREADS = int(os.getenv("VIDEO_SCAN_THREADS", 8))
+
+# Walked folders waiting for the database writer before the walk pauses
+VIDEO_SCAN_QUEUE_SIZE = 64
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+@dataclass
+class WalkedFile:
+    path: str
+    name: str
+    # Directories between the title folder and the file
+    subdirs: Tuple[str, ...]
+    stat: os.stat_result
+
+
+@dataclass
+class WalkedFolder:
+    path: str
+    name: str
+    files: List[WalkedFile] = field(default_factory=list)
+    # Set when part of the folder couldn't be read, `files` is incomplete then
+    error: Optional[OSError] = None
+
+
+def get_walk_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=max(VIDEO_SCAN_THREADS, 1), thread_name_prefix="library-walk")
+    return _pool
+
+
+def shutdown_walk_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def walk_library(root_path: str, folder_paths: Optional[Iterable[str]] = None) -> AsyncIterator[WalkedFolder]:
+    """
+    Yields the video files of every title folder under `root_path`, or of
+    only `folder_paths`, as the worker threads finish them. The listing and
+    stat calls never run on the event loop, and the walk pauses whenever the
+    consumer falls VIDEO_SCAN_QUEUE_SIZE folders behind. Listing the root
+    raises, folders that can't be read are yielded with their `error` set.
+    """
+    loop = asyncio.get_running_loop()
+    if folder_paths is None:
+        folder_paths = await loop.run_in_executor(get_walk_pool(), list_title_folders, root_path)
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=VIDEO_SCAN_QUEUE_SIZE)
+    remaining_paths = iter(folder_paths)
+
+    async def walk_worker():
+        try:
+            # The iterator is shared, each worker takes the next unwalked folder
+            for folder_path in remaining_paths:
+                await queue.put(await loop.run_in_executor(get_walk_pool(), walk_title_folder, folder_path))
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(None)
+
+    workers = [asyncio.create_task(walk_worker()) for _ in range(max(VIDEO_SCAN_THREADS, 1))]
+    try:
+        running = len(workers)
+        while running:
+            item = await queue.get()
+            if item is None:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def list_title_folders(root_path: str) -> List[str]:
+    """
+    Errors propagate, an unmounted or unreachable library must abort the
+    sync rather than look empty and have all its assets pruned.
+    """
+    with os.scandir(root_path) as entries:
+        return [entry.path for entry in entries if entry.is_dir()]
+
+
+def walk_title_folder(folder_path: str) -> WalkedFolder:
+    """
+    Collects the video files anywhere below the folder. Stats come from the
+    DirEntry, which caches them, and symlinked directories aren't followed,
+    same as Path.rglob. A title folder that no longer exists comes back
+    empty, any other error marks the folder as failed and the walk carries
+    on with the directories that can be read.
+    """
+    walked = WalkedFolder(path=folder_path, name=os.path.basename(folder_path))
+    pending_dirs = [(folder_path, ())]
+    while pending_dirs:
+        dir_path, subdirs = pending_dirs.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append((entry.path, subdirs + (entry.name,)))
+                        elif os.path.splitext(entry.name)[1].lower() in VIDEO_FILE_EXTENSIONS and entry.is_file():
+                            walked.files.append(WalkedFile(
+                                path=entry.path, name=entry.name, subdirs=subdirs, stat=entry.stat()
+                            ))
+                    except FileNotFoundError:
+                        # Removed while the folder was being walked
+                        continue
+        except FileNotFoundError as e:
+            if dir_path != folder_path:
+                walked.error = e
+        except OSError as e:
+            walked.error = e
+    return walked
@@ -0,0 +1,97 @@
+import os
+import time
+import asyncio
+import contextlib
+from typing import Dict, List, Optional
+from watchfiles import awatch
+from app.database import AsyncSessionLocal
+from app.services.video_assets import get_video_library_paths, sync_video_folders
+
+# off, auto (inotify, falling back to polling when it can't be set up) or
+# poll. Network shares don't report changes made by other machines through
+# inotify, libraries on them need poll.
+VIDEO_LIBRARY_WATCH = os.getenv("VIDEO_LIBRARY_WATCH", "off").lower()
+
+# Seconds a folder has to stay quiet before it's synced, so files that are
+# still being downloaded or copied aren't probed half written
+VIDEO_LIBRARY_WATCH_DEBOUNCE = float(os.getenv("VIDEO_LIBRARY_WATCH_DEBOUNCE", 10))
+
+# Seconds between directory scans in polling mode
+VIDEO_LIBRARY_POLL_INTERVAL = float(os.getenv("VIDEO_LIBRARY_POLL_INTERVAL", 60))
+
+
+async def run_library_watcher():
+    """
+    Background task started from the app lifespan. Changes are mapped to the
+    title folder they happened in, and each folder is synced and linked on
+    its own once it has been quiet for VIDEO_LIBRARY_WATCH_DEBOUNCE seconds.
+    """
+    if VIDEO_LIBRARY_WATCH not in ("auto", "poll"):
+        return
+
+    library_paths = [path for path in get_video_library_paths() if os.path.isdir(path)]
+    if not library_paths:
+        return
+
+    # Title folder path -> monotonic time of its last change
+    pending: Dict[str, float] = {}
+    sync_task = asyncio.create_task(_sync_quiet_folders(pending))
+    try:
+        await _watch_libraries(library_paths, pending, force_polling=VIDEO_LIBRARY_WATCH == "poll")
+    except Exception as e:
+        print(f"[Warning] Watching video libraries stopped, new files need a manual sync: {e!r}")
+    finally:
+        sync_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await sync_task
+
+
+async def _watch_libraries(library_paths: List[str], pending: Dict[str, float], force_polling: bool):
+    while True:
+        try:
+            async for changes in awatch(
+                *library_paths,
+                force_polling=force_polling,
+                poll_delay_ms=int(VIDEO_LIBRARY_POLL_INTERVAL * 1000),
+                ignore_permission_denied=True,
+            ):
+                now = time.monotonic()
+                for _, changed_path in changes:
+                    folder_path = _title_folder_of(library_paths, changed_path)
+                    if folder_path:
+                        pending[folder_path] = now
+            return
+        except Exception as e:
+            # Usually fs.inotify.max_user_watches being too low for the library
+            if force_polling:
+                raise
+            print(f"[Warning] Watching video libraries with inotify failed, falling back to polling: {e!r}")
+            force_polling = True
+
+
+def _title_folder_of(library_paths: List[str], changed_path: str) -> Optional[str]:
+    """The top level folder of a library the change happened in, None for the library roots themselves."""
+    for library_path in library_paths:
+        relative = os.path.relpath(changed_path, library_path)
+        if relative in (os.curdir, os.pardir) or relative.startswith(os.pardir + os.sep):
+            continue
+        return os.path.join(library_path, relative.split(os.sep)[0])
+    return None
+
+
+async def _sync_quiet_folders(pending: Dict[str, float]):
+    while True:
+        await asyncio.sleep(1)
+        cutoff = time.monotonic() - VIDEO_LIBRARY_WATCH_DEBOUNCE
+        quiet_folders = [path for path, changed_at in pending.items() if changed_at <= cutoff]
+        if not quiet_folders:
+            continue
+        for path in quiet_folders:
+            del pending[path]
+
+        try:
+            async with AsyncSessionLocal() as db:
+                metrics = await sync_video_folders(db, quiet_folders)
+            print(f"[Info] Synced {len(quiet_folders)} changed video library folders: {metrics}")
+        except Exception as e:
+            print(f"[Warning] Syncing changed video library folders failed: {e!r}")
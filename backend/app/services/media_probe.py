@@ -0,0 +1,245 @@
+import os
+import time
+import asyncio
+import hashlib
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+from pymediainfo import MediaInfo
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import MediaProbe
+from app.services.process_pool import LazyProcessPool
+
+# MediaInfo parses run in their own processes. The pool size caps probes
+# overall, VIDEO_PROBE_PER_DISK caps them per device so one library on a
+# spinning disk isn't read from in dozens of places at once.
+VIDEO_PROBE_WORKERS = int(os.getenv("VIDEO_PROBE_WORKERS", min(4, os.cpu_count() or 1)))
+VIDEO_PROBE_PER_DISK = int(os.getenv("VIDEO_PROBE_PER_DISK", 2))
+
+# Bytes hashed from both ends of a file to recognise it after a move across disks
+PARTIAL_HASH_BYTES = 64 * 1024
+
+# Hashes read per device at once. Two small reads each, so they run in threads
+# under their own limit instead of queueing behind the probes of earlier folders.
+PARTIAL_HASH_PER_DISK = 4
+
+# Keys per IN (...) lookup, and rows per insert, against the probe cache
+PROBE_CACHE_LOOKUP_CHUNK = 1000
+
+_pool = LazyProcessPool(VIDEO_PROBE_WORKERS)
+_disk_semaphores: Dict[int, asyncio.Semaphore] = {}
+_hash_semaphores: Dict[int, asyncio.Semaphore] = {}
+
+
+@dataclass
+class ProbeStats:
+    probed_files: int = 0
+    probe_total_ms: float = 0.0
+    probe_max_ms: float = 0.0
+    cached_files: int = 0
+
+    def add(self, elapsed_ms: float):
+        self.probed_files += 1
+        self.probe_total_ms += elapsed_ms
+        self.probe_max_ms = max(self.probe_max_ms, elapsed_ms)
+
+    def as_metrics(self) -> Dict[str, float]:
+        return {
+            "probed_files": self.probed_files,
+            "cached_probes": self.cached_files,
+            "probe_total_ms": round(self.probe_total_ms, 1),
+            "probe_max_ms": round(self.probe_max_ms, 1),
+        }
+
+
+def shutdown_probe_pool():
+    _pool.shutdown()
+
+
+class ProbeSession:
+    """
+    Metadata for the new or changed files of a sync. Files probed before
+    under any path are answered from the `media_probes` cache: first by
+    (device, inode, size, mtime), which covers renames and moves within a
+    filesystem, then by a hash of the file's ends, which covers remounts and
+    copies. Only the rest queue a MediaInfo parse.
+
+    The sync owns the database session, so new cache entries are collected
+    here and written with `flush`.
+    """
+
+    def __init__(self, stats: Optional[ProbeStats] = None):
+        self.stats = stats if stats is not None else ProbeStats()
+        self.results: Dict[str, asyncio.Future] = {}
+        self.new_entries: List[Dict[str, Any]] = []
+
+    async def start(self, db: AsyncSession, stat_results: Dict[str, os.stat_result]):
+        loop = asyncio.get_running_loop()
+        stat_keys = {path: _stat_key(st) for path, st in stat_results.items()}
+
+        cached = {}
+        by_stat_key = await _load_cached(db, tuple_(
+            MediaProbe.device, MediaProbe.inode, MediaProbe.size, MediaProbe.mtime
+        ), set(stat_keys.values()), lambda probe: (probe.device, probe.inode, probe.size, probe.mtime))
+        for path, key in stat_keys.items():
+            if key in by_stat_key:
+                cached[path] = by_stat_key[key]
+
+        remaining = [path for path in stat_results if path not in cached]
+        hashes = dict(zip(remaining, await asyncio.gather(*(_run_partial_hash(path) for path in remaining))))
+        by_hash = await _load_cached(
+            db, MediaProbe.partial_hash, {h for h in hashes.values() if h}, lambda probe: probe.partial_hash
+        )
+
+        for path in remaining:
+            partial_hash = hashes[path]
+            hit = by_hash.get(partial_hash) if partial_hash else None
+            if hit is not None:
+                cached[path] = hit
+                # Remember this identity too, so the next move is a plain stat key hit
+                self._remember(stat_keys[path], partial_hash, hit)
+            elif partial_hash:
+                self.results[path] = asyncio.ensure_future(self._probe_and_remember(path, stat_keys[path], partial_hash))
+            else:
+                self.results[path] = asyncio.ensure_future(probe_media_info(path, self.stats))
+
+        for path, media_info in cached.items():
+            future = loop.create_future()
+            future.set_result(media_info)
+            self.results[path] = future
+        self.stats.cached_files += len(cached)
+
+    def get(self, path: str) -> Optional[asyncio.Future]:
+        return self.results.get(path)
+
+    def ready(self, paths: Iterable[str]) -> bool:
+        """Whether none of the paths is still waiting on a probe."""
+        return all(path not in self.results or self.results[path].done() for path in paths)
+
+    async def flush(self, db: AsyncSession):
+        entries, self.new_entries = self.new_entries, []
+        for i in range(0, len(entries), PROBE_CACHE_LOOKUP_CHUNK):
+            stmt = insert(MediaProbe).values(entries[i:i + PROBE_CACHE_LOOKUP_CHUNK])
+            await db.execute(stmt.on_conflict_do_nothing(constraint="uq_media_probe_stat"))
+
+    def cancel(self):
+        for future in self.results.values():
+            future.cancel()
+
+    async def _probe_and_remember(self, path: str, stat_key: tuple, partial_hash: str) -> dict:
+        media_info = await probe_media_info(path, self.stats)
+        # Failed parses aren't cached, the file may just still be copying
+        if media_info:
+            self._remember(stat_key, partial_hash, media_info)
+        return media_info
+
+    def _remember(self, stat_key: tuple, partial_hash: str, media_info: dict):
+        device, inode, size, mtime = stat_key
+        self.new_entries.append({
+            "device": device, "inode": inode, "size": size, "mtime": mtime,
+            "partial_hash": partial_hash, "media_info": media_info,
+        })
+
+
+def _stat_key(stat_result: os.stat_result) -> tuple:
+    # Masked into BIGINT range, some network filesystems hand out unsigned 64 bit ids
+    mask = (1 << 63) - 1
+    return stat_result.st_dev & mask, stat_result.st_ino & mask, stat_result.st_size, stat_result.st_mtime
+
+
+async def _load_cached(db: AsyncSession, column, keys: Iterable, key_of) -> Dict[Any, dict]:
+    keys = list(keys)
+    found = {}
+    for i in range(0, len(keys), PROBE_CACHE_LOOKUP_CHUNK):
+        stmt = select(MediaProbe).where(column.in_(keys[i:i + PROBE_CACHE_LOOKUP_CHUNK]))
+        for probe in (await db.execute(stmt)).scalars():
+            found[key_of(probe)] = probe.media_info
+    return found
+
+
+async def _run_partial_hash(file_path: str) -> Optional[str]:
+    try:
+        device = os.stat(file_path).st_dev
+    except OSError:
+        return None
+
+    async with _disk_semaphore(_hash_semaphores, device, PARTIAL_HASH_PER_DISK):
+        return await asyncio.to_thread(partial_file_hash, file_path)
+
+
+def partial_file_hash(file_path: str) -> Optional[str]:
+    """Hash of the size and the first and last PARTIAL_HASH_BYTES, enough to tell media files apart."""
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            digest.update(size.to_bytes(8, "little"))
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+            if size > PARTIAL_HASH_BYTES:
+                f.seek(max(size - PARTIAL_HASH_BYTES, PARTIAL_HASH_BYTES))
+                digest.update(f.read(PARTIAL_HASH_BYTES))
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+async def probe_media_info(file_path: str, stats: Optional[ProbeStats] = None) -> dict:
+    """
+    Queues a MediaInfo parse of the file. Callers can fire these for whole
+    libraries at once, the per-disk semaphores and the pool do the queueing.
+    """
+    try:
+        device = os.stat(file_path).st_dev
+    except OSError:
+        return {}
+
+    async with _disk_semaphore(_disk_semaphores, device, VIDEO_PROBE_PER_DISK):
+        start = time.perf_counter()
+        try:
+            metadata = await _pool.run(extract_media_info, file_path)
+        except BrokenProcessPool:
+            metadata = {}
+
+    if stats is not None:
+        stats.add((time.perf_counter() - start) * 1000)
+    return metadata
+
+
+def _disk_semaphore(semaphores: Dict[int, asyncio.Semaphore], device: int, limit: int) -> asyncio.Semaphore:
+    semaphore = semaphores.get(device)
+    if semaphore is None:
+        semaphore = semaphores[device] = asyncio.Semaphore(max(limit, 1))
+    return semaphore
+
+
+def extract_media_info(file_path: str) -> dict:
+    try:
+        mi = MediaInfo.parse(file_path, parse_speed=0)
+        general = mi.general_tracks[0] if mi.general_tracks else None
+        video = mi.video_tracks[0] if mi.video_tracks else None
+
+        if not general and not video: return {}
+
+        bit_depth = None
+        if video and video.bit_depth:
+            digits = ''.join(filter(str.isdigit, str(video.bit_depth)))
+            bit_depth = int(digits) if digits else None
+
+        frame_rate = None
+        if video and video.frame_rate:
+            try: frame_rate = float(video.frame_rate)
+            except ValueError: pass
+
+        return {
+            "resolution": f"{video.width}x{video.height}" if video and video.width else None,
+            "hdr_type": video.hdr_format if video else None,
+            "filesize_bytes": general.file_size if general else None,
+            "duration_ms": general.duration if general else None,
+            "codec": video.format if video else None,
+            "bit_depth": bit_depth,
+            "frame_rate": frame_rate
+        }
+    except Exception:
+        return {}
@@ -0,0 +1,133 @@
+import json
+import time
+import uuid
+import asyncio
+import contextlib
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional
+from app.database import AsyncSessionLocal
+from app.services.video_assets import SyncProgress, sync_all_video_assets
+
+# Seconds between events on a sync's progress stream
+SYNC_PROGRESS_INTERVAL = 1.0
+
+
+@dataclass
+class SyncJob:
+    job_id: str
+    progress: SyncProgress = field(default_factory=SyncProgress)
+    status: str = "running"  # running, completed, cancelled or failed
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    resumed_from: Optional[str] = None
+    metrics: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+
+    def snapshot(self) -> dict:
+        progress = self.progress
+        elapsed = (self.finished_at or time.time()) - self.started_at
+
+        # Folder rate so far, only meaningful while scanning
+        eta_seconds = None
+        if self.status == "running" and progress.stage == "scanning" and progress.folders_scanned:
+            remaining = max(progress.folders_total - progress.folders_scanned, 0)
+            eta_seconds = round(elapsed / progress.folders_scanned * remaining, 1)
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": progress.stage,
+            "resumed_from": self.resumed_from,
+            "folders_total": progress.folders_total,
+            "folders_scanned": progress.folders_scanned,
+            "folders_skipped": len(progress.skipped_folders),
+            "files_probed": progress.probe_stats.probed_files + progress.probe_stats.cached_files,
+            "rows_written": progress.rows_written,
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta_seconds,
+            "metrics": self.metrics,
+            "error": self.error,
+        }
+
+
+# Running jobs and the most recently finished one, older ones can't be looked up anymore
+_jobs: Dict[str, SyncJob] = {}
+_latest_job: Optional[SyncJob] = None
+
+
+def start_sync_job(resume: bool = False) -> SyncJob:
+    """
+    Starts a full library sync in the background, or returns the one that is
+    already running. With `resume`, folders the previous sync completed
+    before it was cancelled or failed are skipped.
+    """
+    global _latest_job
+    if _latest_job is not None and _latest_job.status == "running":
+        return _latest_job
+
+    job = SyncJob(job_id=uuid.uuid4().hex)
+    if resume and _latest_job is not None and _latest_job.status in ("cancelled", "failed"):
+        previous = _latest_job.progress
+        job.progress.skipped_folders = previous.skipped_folders | previous.completed_folders
+        job.resumed_from = _latest_job.job_id
+
+    job.task = asyncio.create_task(_run_sync_job(job))
+    _jobs[job.job_id] = job
+    _latest_job = job
+    return job
+
+
+def get_sync_job(job_id: str) -> Optional[SyncJob]:
+    return _jobs.get(job_id)
+
+
+async def cancel_sync_job(job: SyncJob):
+    """Cancels the job and waits until it has stopped. Folders written so far stay, a resumed sync skips them."""
+    if job.status == "running" and job.task is not None:
+        job.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await job.task
+        # A task cancelled before it ever ran never got to update the job
+        if job.status == "running":
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            _forget_finished_jobs(keep=job)
+
+
+async def stop_sync_jobs():
+    for job in list(_jobs.values()):
+        await cancel_sync_job(job)
+
+
+async def iter_sync_events(job: SyncJob) -> AsyncIterator[str]:
+    """Server-sent events with the job's snapshot, the last one once it has finished."""
+    while True:
+        snapshot = job.snapshot()
+        yield f"data: {json.dumps(snapshot)}\n\n"
+        if snapshot["status"] != "running":
+            return
+        await asyncio.sleep(SYNC_PROGRESS_INTERVAL)
+
+
+async def _run_sync_job(job: SyncJob):
+    try:
+        async with AsyncSessionLocal() as db:
+            job.metrics = await sync_all_video_assets(db, job.progress)
+        job.status = "completed"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        raise
+    except Exception as e:
+        job.status = "failed"
+        job.error = repr(e)
+        print(f"[Warning] Video library sync {job.job_id} failed: {e!r}")
+    finally:
+        job.finished_at = time.time()
+        _forget_finished_jobs(keep=job)
+
+
+def _forget_finished_jobs(keep: SyncJob):
+    for job_id, job in list(_jobs.items()):
+        if job is not keep and job.status != "running":
+            del _jobs[job_id]
@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Type
 from app.config import DEFAULT_MAX_QUERY_LIMIT
 from app.settings.config import DEFAULT_SETTINGS
+from app.services.images import fill_title_placeholders
 from app.services.languages import LanguageContext, fill_translated_fields_dynamically, get_user_language_context
 from app.enums import SortBy, SortDirection
 from app.models import (
@@ -483,7 +484,9 @@ async def run_title_search(
 
     result = await db.execute(stmt)
     rows = result.mappings().unique().all()
-    return _build_title_list_out(rows, total, page, size, title_schema, user_title_details_schema, locale_ctx)
+    title_list = _build_title_list_out(rows, total, page, size, title_schema, user_title_details_schema, locale_ctx)
+    await fill_title_placeholders(db, title_list.titles)
+    return title_list
 
 
 async def get_title_search_suggestions(
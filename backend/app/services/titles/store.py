@@ -5,6 +5,7 @@ from typing import Optional
 from app.integrations import tmdb
 from app.integrations.jellyfin import build_jellyfin_map, fetch_jellyfin_titles, resolve_jellyfin_id
 from app.services.images import select_best_image, store_image_details
+from app.services.image_prefetch import prefetch_title_images
 from app.services.genres import store_title_genres
 from app.services.languages import LanguageContext, get_user_language_context
 from app.services.tmdb_collections import coordinate_tmdb_collection_fetching, init_tmdb_collection
@@ -80,6 +81,9 @@ async def coordinate_title_fetching(
     else:
         raise ValueError(f"Invalid title type: {title_type}")
     
+    # Warm the image cache for the first visit of the title page
+    await prefetch_title_images(db, title_id)
+
     # Finalize links and such
     if title_id not in title_ids_to_link:
         title_ids_to_link.append(title_id)
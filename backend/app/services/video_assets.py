@@ -2,207 +2,404 @@ import json
 import re
 import os
 import asyncio
+import hashlib
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any, List, Tuple, Optional, Set
-from rapidfuzz import fuzz
-from pymediainfo import MediaInfo
-from sqlalchemy import select, extract
+from typing import Dict, Any, Deque, Iterable, List, Tuple, Optional, Set
+from rapidfuzz import fuzz, process
+from sqlalchemy import (
+    Column, MetaData, String, Table, and_, bindparam, delete, exists, extract, func, literal, or_, select, true,
+    union_all
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from app.enums import VideoType
-from app.models import Season, Title, Episode, VideoAsset, TitleFolder
+from app.models import Season, Title, TitleTranslation, Episode, VideoAsset, TitleFolder
+from app.services.library_walker import WalkedFolder, get_walk_pool, list_title_folders, walk_library
+from app.services.media_probe import ProbeSession, ProbeStats
+from app.services.video_streaming import invalidate_video_asset_cache
 
 # Regex patterns
 TITLE_REGEX = re.compile(r"^(.*)\s\((\d{4})\)")
 EPISODE_REGEX = re.compile(r"[Ss](\d+)[Ee](\d+)")
 
+# VideoAsset columns filled from MediaInfo
+MEDIA_INFO_COLUMNS = ("resolution", "hdr_type", "filesize_bytes", "duration_ms", "codec", "bit_depth", "frame_rate")
+
+# Rows per multi-row upsert. 12 columns each keeps a statement well below the
+# 32767 bind parameters asyncpg allows, so flush() splits bigger batches.
+VIDEO_SYNC_BATCH_SIZE = 1000
+
+# Full syncs and the library watcher's folder syncs must not write the same folders at once
+_sync_lock = asyncio.Lock()
+
+# Reverse index of folder names, dropped whenever a sync may have added or removed folders
+_folder_name_index: Optional["FolderNameIndex"] = None
+
+
+@dataclass
+class SyncProgress:
+    """Counters a full sync updates as it goes, read by sync jobs for their progress stream."""
+    stage: str = "listing"
+    folders_total: int = 0
+    folders_scanned: int = 0
+    rows_written: int = 0
+    probe_stats: ProbeStats = field(default_factory=ProbeStats)
+    # Title folders whose rows are committed
+    completed_folders: Set[str] = field(default_factory=set)
+    # Title folders an earlier, interrupted sync completed, left alone when resuming it
+    skipped_folders: Set[str] = field(default_factory=set)
+
+
 # --------- COORDINATING METHOD ---------
 
-async def sync_all_video_assets(db: AsyncSession) -> Dict[str, int]:
+def get_video_library_paths() -> List[str]:
     config_raw = os.environ.get("VIDEO_ASSET_CONFIG", "[]")
-    libraries = json.loads(config_raw)
-    active_library_paths = []
-    
-    metrics = {
+    return [str(Path(lib['path']).absolute()) for lib in json.loads(config_raw)]
+
+
+async def sync_all_video_assets(db: AsyncSession, progress: Optional[SyncProgress] = None) -> Dict[str, int]:
+    if progress is None:
+        progress = SyncProgress()
+    probe_stats = progress.probe_stats
+
+    async with _sync_lock:
+        active_library_paths = get_video_library_paths()
+
+        metrics = _empty_sync_metrics()
+
+        # Listed up front, so the progress has a total to count towards
+        loop = asyncio.get_running_loop()
+        listed_folders = {}
+        for lib_path in active_library_paths:
+            if not os.path.isdir(lib_path):
+                listed_folders[lib_path] = []
+                continue
+            # Raises when the library can't be listed, instead of pruning it as if it were empty
+            title_folders = await loop.run_in_executor(get_walk_pool(), list_title_folders, lib_path)
+            listed_folders[lib_path] = [path for path in title_folders if path not in progress.skipped_folders]
+        progress.folders_total = sum(len(paths) for paths in listed_folders.values())
+
+        progress.stage = "scanning"
+        for lib_path in active_library_paths:
+            dir_metrics = await _sync_directory_to_db(
+                db=db, directory_path=lib_path, probe_stats=probe_stats,
+                progress=progress, listed_folders=listed_folders[lib_path]
+            )
+            _add_directory_metrics(metrics, dir_metrics)
+
+        progress.stage = "pruning"
+        pruned_assets, pruned_links, pruned_folders = await _prune_removed_libraries(db, active_library_paths)
+        metrics["removed_video_assets"] += pruned_assets
+        metrics["removed_links"] += pruned_links
+
+        progress.stage = "linking"
+        _invalidate_folder_name_index()
+        metrics["added_links"] += await link_video_assets(db)
+
+    # Paths may have been added, moved or removed
+    invalidate_video_asset_cache()
+    metrics.update(probe_stats.as_metrics())
+    return metrics
+
+
+async def sync_video_folders(db: AsyncSession, folder_paths: Iterable[str]) -> Dict[str, int]:
+    """
+    Syncs and links only the given title folders, for the library watcher.
+    Folders that are gone lose their assets, paths outside the configured
+    libraries are ignored.
+    """
+    library_paths = set(get_video_library_paths())
+    folders_by_library: Dict[str, Set[str]] = {}
+    for folder_path in folder_paths:
+        folder_path = str(Path(folder_path).absolute())
+        lib_path = os.path.dirname(folder_path)
+        if lib_path in library_paths:
+            folders_by_library.setdefault(lib_path, set()).add(folder_path)
+
+    metrics = _empty_sync_metrics()
+    probe_stats = ProbeStats()
+    if not folders_by_library:
+        return metrics
+
+    async with _sync_lock:
+        for lib_path, lib_folders in folders_by_library.items():
+            dir_metrics = await _sync_directory_to_db(
+                db=db, directory_path=lib_path, probe_stats=probe_stats, folder_paths=lib_folders
+            )
+            _add_directory_metrics(metrics, dir_metrics)
+        _invalidate_folder_name_index()
+
+        all_folders = set().union(*folders_by_library.values())
+        folder_stmt = select(TitleFolder.title_folder_id).where(TitleFolder.title_folder_path.in_(all_folders))
+        title_folder_ids = (await db.execute(folder_stmt)).scalars().all()
+        if title_folder_ids:
+            metrics["added_links"] += await link_video_assets(db, title_folder_ids=title_folder_ids)
+
+    invalidate_video_asset_cache()
+    metrics.update(probe_stats.as_metrics())
+    return metrics
+
+
+def _empty_sync_metrics() -> Dict[str, int]:
+    return {
         "added_folders": 0, "added_video_assets": 0, "removed_video_assets": 0, 
-        "added_links": 0, "removed_links": 0
+        "added_links": 0, "removed_links": 0, "failed_folders": 0
     }
 
-    for lib in libraries:
-        lib_path = lib['path']
-        active_library_paths.append(lib_path)
-            
-        dir_metrics = await _sync_directory_to_db(db=db, directory_path=lib_path)
-        metrics["added_folders"] += dir_metrics["added_folders"]
-        metrics["added_video_assets"] += dir_metrics["added_assets"]
-        metrics["removed_video_assets"] += dir_metrics["removed_assets"]
-        metrics["removed_links"] += dir_metrics["removed_links"]
-
-    pruned_assets, pruned_links, pruned_folders = await _prune_removed_libraries(db, active_library_paths)
-    metrics["removed_video_assets"] += pruned_assets
-    metrics["removed_links"] += pruned_links
-
-    metrics["added_links"] += await link_video_assets(db)
-    return metrics
+
+def _add_directory_metrics(metrics: Dict[str, int], dir_metrics: Dict[str, int]):
+    metrics["added_folders"] += dir_metrics["added_folders"]
+    metrics["added_video_assets"] += dir_metrics["added_assets"]
+    metrics["removed_video_assets"] += dir_metrics["removed_assets"]
+    metrics["removed_links"] += dir_metrics["removed_links"]
+    metrics["failed_folders"] += dir_metrics["failed_folders"]
 
 
 # --------- DISK SCANNING & METADATA ---------
 
-async def _sync_directory_to_db(db: AsyncSession, directory_path: str) -> Dict[str, int]:
+async def _sync_directory_to_db(
+    db: AsyncSession, directory_path: str, probe_stats: Optional[ProbeStats] = None,
+    folder_paths: Optional[Set[str]] = None, progress: Optional[SyncProgress] = None,
+    listed_folders: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """
+    Syncs every title folder of the library, or only `folder_paths` when
+    given. A full sync can pass the folders it already listed, and when
+    resuming, files of the progress' skipped folders count as seen.
+    """
+    if progress is None:
+        progress = SyncProgress()
     root = Path(directory_path)
-    metrics = {"added_folders": 0, "added_assets": 0, "removed_assets": 0, "removed_links": 0}
+    metrics = {"added_folders": 0, "added_assets": 0, "removed_assets": 0, "removed_links": 0, "failed_folders": 0}
     if not root.exists(): return metrics
 
     seen_file_paths: Set[str] = set()
-    seen_folder_ids: Set[int] = set()
-
-    for folder in root.iterdir():
-        if not folder.is_dir(): continue
-        valid_files = [f for f in folder.rglob("*") if f.suffix.lower() in ['.mkv', '.mp4', '.avi']]
-        if not valid_files: continue
-
-        # 1. Upsert Title Folder
-        str_folder_path = str(folder.absolute())
-        stmt_folder = select(TitleFolder).where(TitleFolder.title_folder_path == str_folder_path)
-        tf = (await db.execute(stmt_folder)).scalar_one_or_none()
-        
-        if not tf:
-            tf = TitleFolder(title_folder_path=str_folder_path, title_folder_name=folder.name)
-            db.add(tf)
-            await db.flush() # Flush to get the title_folder_id
-            metrics["added_folders"] += 1
-            
-        seen_folder_ids.add(tf.title_folder_id)
-
-        # 2. Prep files and mtimes (Logic remains identical)
-        str_paths = [str(f.absolute()) for f in valid_files]
-        stmt = select(VideoAsset).where(VideoAsset.file_path.in_(str_paths))
-        asset_map = {a.file_path: a for a in (await db.execute(stmt)).scalars().all()}
-
-        files_to_scan, file_mtimes = [], {}
-        for f in valid_files:
-            path_str = str(f.absolute())
-            mtime = f.stat().st_mtime
-            file_mtimes[path_str] = mtime
-            asset = asset_map.get(path_str)
-            if not asset or getattr(asset, 'mtime', 0) < mtime:
-                files_to_scan.append(path_str)
-
-        # 3. Scan Metadata
-        parsed_metadata_map = {}
-        if files_to_scan:
-            async def _parse_worker(path: str):
-                return path, await asyncio.to_thread(_extract_media_info, path)
-            results = await asyncio.gather(*[_parse_worker(p) for p in files_to_scan])
-            parsed_metadata_map = {p: meta for p, meta in results}
-
-        # 4. Upsert Records
-        for file in valid_files:
-            path_str = str(file.absolute())
-            metadata = parsed_metadata_map.get(path_str)
-            
-            rel_parts = file.relative_to(folder).parts[:-1]
-            if EPISODE_REGEX.search(file.name): v_type = VideoType.episode
-            elif rel_parts: v_type = VideoType.featurette
-            else: v_type = VideoType.movie
-
-            is_new = await _upsert_base_media_asset(
-                db=db, 
-                existing_asset=asset_map.get(path_str),
-                v_type=v_type, 
-                file_path=file,
-                folder_id=tf.title_folder_id,  # <-- Pass the ID here!
-                current_mtime=file_mtimes[path_str],
-                metadata=metadata
-            )
-            seen_file_paths.add(path_str)
-            if is_new: metrics["added_assets"] += 1
+    root_path = str(root.absolute())
+    if folder_paths is None:
+        scan_prefixes = [os.path.join(root_path, '')]
+        folder_filter = TitleFolder.title_folder_path.like(f"{scan_prefixes[0]}%")
+    else:
+        scan_prefixes = [os.path.join(path, '') for path in sorted(folder_paths)]
+        folder_filter = TitleFolder.title_folder_path.in_(folder_paths)
+
+    # 1. Load what the library already has in two queries instead of per folder ones
+    folder_stmt = (
+        select(TitleFolder.title_folder_path, TitleFolder.title_folder_id)
+        .where(folder_filter)
+    )
+    folder_ids = {path: folder_id for path, folder_id in (await db.execute(folder_stmt)).all()}
+
+    asset_stmt = (
+        select(VideoAsset.file_path, VideoAsset.file_name, VideoAsset.title_folder_id, VideoAsset.video_type, VideoAsset.mtime)
+        .where(or_(*(VideoAsset.file_path.like(f"{prefix}%") for prefix in scan_prefixes)))
+    )
+    asset_map = {row.file_path: row for row in (await db.execute(asset_stmt)).all()}
+
+    if progress.skipped_folders:
+        skipped_ids = {folder_ids[path] for path in progress.skipped_folders if path in folder_ids}
+        seen_file_paths.update(path for path, row in asset_map.items() if row.title_folder_id in skipped_ids)
+
+    batch = _AssetBatch()
+    probes = ProbeSession(probe_stats)
+    # Walked folders whose rows haven't been queued yet, in walk order
+    waiting_folders: Deque[Tuple[WalkedFolder, int]] = deque()
+    # Folders whose rows are in the batch, complete once it's committed
+    batched_folders: List[str] = []
+
+    async def flush_batch():
+        await probes.flush(db)
+        progress.rows_written += await batch.flush(db)
+        progress.completed_folders.update(batched_folders)
+        batched_folders.clear()
+
+    async def write_folder(walked: WalkedFolder, folder_id: int):
+        await _queue_folder_rows(walked, folder_id, asset_map, probes, batch, metrics)
+        seen_file_paths.update(f.path for f in walked.files)
+        # Failed folders stay incomplete, a resumed sync walks them again
+        if not walked.error:
+            batched_folders.append(walked.path)
+        if batch.size >= VIDEO_SYNC_BATCH_SIZE:
+            await flush_batch()
+
+    # 2. Folders stream in from the walker threads. Moved or renamed files come
+    # from the probe cache, every other probe is queued as soon as its folder
+    # is walked, so walking, probing and writing overlap. Rows are written
+    # folder by folder once their probes are done.
+    try:
+        async for walked in walk_library(root_path, folder_paths if folder_paths is not None else listed_folders):
+            progress.folders_scanned += 1
+            if walked.error:
+                # Files that couldn't be listed may still be there, keep every asset the folder has
+                print(f"[Warning] Scanning '{walked.path}' failed, its assets are kept as they are: {walked.error!r}")
+                metrics["failed_folders"] += 1
+                folder_prefix = os.path.join(walked.path, '')
+                seen_file_paths.update(path for path in asset_map if path.startswith(folder_prefix))
+                if not walked.files:
+                    continue
+            elif not walked.files:
+                batched_folders.append(walked.path)
+                continue
+
+            # 3. Insert the Title Folder if it's new
+            folder_id = folder_ids.get(walked.path)
+            if folder_id is None:
+                stmt_folder = (
+                    insert(TitleFolder)
+                    .values(title_folder_path=walked.path, title_folder_name=walked.name)
+                    .returning(TitleFolder.title_folder_id)
+                )
+                folder_id = (await db.execute(stmt_folder)).scalar_one()
+                folder_ids[walked.path] = folder_id
+                metrics["added_folders"] += 1
+
+            # 4. Scan Metadata of new and modified files
+            files_to_scan = {}
+            for f in walked.files:
+                asset = asset_map.get(f.path)
+                if not asset or (asset.mtime or 0) < f.stat.st_mtime:
+                    files_to_scan[f.path] = f.stat
+            if files_to_scan:
+                await probes.start(db, files_to_scan)
+
+            waiting_folders.append((walked, folder_id))
+            while waiting_folders and probes.ready(f.path for f in waiting_folders[0][0].files):
+                await write_folder(*waiting_folders.popleft())
+
+        while waiting_folders:
+            await write_folder(*waiting_folders.popleft())
+    finally:
+        probes.cancel()
+
+    await flush_batch()
 
     # Prune stale files 
-    stale_assets, stale_links = await _prune_stale_assets(db, directory_path, seen_file_paths)
+    stale_assets, stale_links = await _prune_stale_assets(db, scan_prefixes, seen_file_paths)
     metrics["removed_assets"] += stale_assets
     metrics["removed_links"] += stale_links
     
     # We should also prune orphaned TitleFolders here ideally
+    if folder_paths is not None:
+        await _prune_empty_folders(db, folder_paths)
     return metrics
 
 
-async def _upsert_base_media_asset(
-    db: AsyncSession, existing_asset: Optional[VideoAsset], v_type: VideoType, 
-    file_path: Path, folder_id: int, current_mtime: float, metadata: Optional[Dict[str, Any]]
-) -> bool:
-    str_path = str(file_path.absolute())
-    is_new = False
-    asset = existing_asset
-
-    if not asset:
-        asset = VideoAsset(
-            file_path=str_path,
-            file_name=file_path.name,
-            title_folder_id=folder_id, # Updated!
-            video_type=v_type
-        )
-        db.add(asset)
-        is_new = True
-    else:
-        asset.file_name = file_path.name 
-        asset.title_folder_id = folder_id # Updated!
-        asset.video_type = v_type
+async def _queue_folder_rows(
+    walked: WalkedFolder, folder_id: int, asset_map: Dict[str, Any],
+    probes: ProbeSession, batch: "_AssetBatch", metrics: Dict[str, int]
+):
+    """Queues the rows of a folder that actually changed, waiting on its probes as needed."""
+    for file in walked.files:
+        if EPISODE_REGEX.search(file.name): v_type = VideoType.episode
+        elif file.subdirs: v_type = VideoType.featurette
+        else: v_type = VideoType.movie
+
+        row = {
+            "file_path": file.path,
+            "file_name": file.name,
+            "title_folder_id": folder_id,
+            "video_type": v_type,
+        }
+        existing = asset_map.get(file.path)
+        probe = probes.get(file.path)
+        metadata = await probe if probe else None
+
+        # A failed parse returns {}, existing metadata is kept and the mtime
+        # left alone, so the file is probed again on the next sync
+        if metadata:
+            row.update({column: metadata.get(column) for column in MEDIA_INFO_COLUMNS})
+            row["mtime"] = file.stat.st_mtime
+            batch.with_metadata.append(row)
+        elif existing is None or (existing.file_name, existing.title_folder_id, existing.video_type) != (file.name, folder_id, v_type):
+            batch.without_metadata.append(row)
+        else:
+            continue
 
-    if metadata is not None:
-        for k, v in metadata.items():
-            setattr(asset, k, v)
-        asset.mtime = current_mtime
+        if not existing: metrics["added_assets"] += 1
+
+
+class _AssetBatch:
+    """
+    Pending VideoAsset rows, written with multi-row upserts of at most
+    VIDEO_SYNC_BATCH_SIZE rows per shape.
+    Rows without fresh metadata must not touch the metadata columns, so they
+    go in their own statement.
+    """
+
+    def __init__(self):
+        self.with_metadata: List[Dict[str, Any]] = []
+        self.without_metadata: List[Dict[str, Any]] = []
+
+    @property
+    def size(self) -> int:
+        return len(self.with_metadata) + len(self.without_metadata)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Writes and commits the pending rows, returns how many there were."""
+        written = 0
+        for rows, columns in (
+            (self.with_metadata, ("file_name", "title_folder_id", "video_type", "mtime", *MEDIA_INFO_COLUMNS)),
+            (self.without_metadata, ("file_name", "title_folder_id", "video_type")),
+        ):
+            # A single large folder can queue more rows than fit in one statement
+            for i in range(0, len(rows), VIDEO_SYNC_BATCH_SIZE):
+                stmt = insert(VideoAsset).values(rows[i:i + VIDEO_SYNC_BATCH_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["file_path"],
+                    set_={column: stmt.excluded[column] for column in columns}
+                )
+                await db.execute(stmt)
+            written += len(rows)
+            rows.clear()
 
-    await db.commit()
-    return is_new
+        await db.commit()
+        return written
 
 
-def _extract_media_info(file_path: str) -> dict:
-    try:
-        mi = MediaInfo.parse(file_path, parse_speed=0)
-        general = mi.general_tracks[0] if mi.general_tracks else None
-        video = mi.video_tracks[0] if mi.video_tracks else None
-
-        if not general and not video: return {}
-
-        bit_depth = None
-        if video and video.bit_depth:
-            digits = ''.join(filter(str.isdigit, str(video.bit_depth)))
-            bit_depth = int(digits) if digits else None
-
-        frame_rate = None
-        if video and video.frame_rate:
-            try: frame_rate = float(video.frame_rate)
-            except ValueError: pass
-
-        return {
-            "resolution": f"{video.width}x{video.height}" if video and video.width else None,
-            "hdr_type": video.hdr_format if video else None,
-            "filesize_bytes": general.file_size if general else None,
-            "duration_ms": general.duration if general else None,
-            "codec": video.format if video else None,
-            "bit_depth": bit_depth,
-            "frame_rate": frame_rate
-        }
-    except Exception:
-        return {}
+# --------- TITLE AND VIDEO ASSET LINKING ---------
 
 
-# --------- TITLE AND VIDEO ASSET LINKING ---------
+async def link_video_assets(
+    db: AsyncSession, candidate_title_ids: Optional[List[int]] = None, title_folder_ids: Optional[List[int]] = None
+) -> int:
+    """
+    Links TitleFolders to Titles, and VideoAssets to Episodes. With
+    `title_folder_ids` only those folders are linked, and titles already
+    linked to any other folder stay with it until the next full sync.
 
+    With `candidate_title_ids` alone, only the folders whose name could
+    match one of the candidates, or that are already linked to one, are
+    looked at.
+    """
 
-async def link_video_assets(db: AsyncSession, candidate_title_ids: Optional[List[int]] = None) -> int:
-    """Links TitleFolders to Titles, and VideoAssets to Episodes."""
+    # Every candidate name in one query instead of one per folder
+    title_index = await TitleNameIndex.load(db, candidate_title_ids)
+
+    if candidate_title_ids and title_folder_ids is None:
+        title_folder_ids = await _find_candidate_folder_ids(db, title_index, candidate_title_ids)
+        if not title_folder_ids:
+            return 0
     
     # Grab all folders
     stmt = select(TitleFolder).options(selectinload(TitleFolder.video_assets))
+    if title_folder_ids is not None:
+        stmt = stmt.where(TitleFolder.title_folder_id.in_(title_folder_ids))
     folders = (await db.execute(stmt)).scalars().all()
     if not folders: 
         return 0
 
     links_modified = 0
-    claimed_titles: Dict[int, Tuple[TitleFolder, int]] = {}
+    claimed_titles: Dict[int, Tuple[TitleFolder, float]] = {}
+
+    if title_folder_ids is not None:
+        other_stmt = (
+            select(TitleFolder)
+            .where(TitleFolder.title_id.is_not(None), TitleFolder.title_folder_id.not_in(title_folder_ids))
+        )
+        for other_folder in (await db.execute(other_stmt)).scalars():
+            claimed_titles[other_folder.title_id] = (other_folder, float("inf"))
 
     for folder in folders:
         match = TITLE_REGEX.match(folder.title_folder_name)
@@ -213,23 +410,13 @@ async def link_video_assets(db: AsyncSession, candidate_title_ids: Optional[List
         target_name_norm = _normalize_string(folder_name_raw)
         folder_year = int(year_str)
 
-        # Build Title Query
-        title_stmt = select(Title).options(selectinload(Title.translations))
-        title_stmt = title_stmt.where(extract('year', Title.release_date) == folder_year)
-        if candidate_title_ids:
-            title_stmt = title_stmt.where(Title.title_id.in_(candidate_title_ids))
-
-        candidates = (await db.execute(title_stmt)).scalars().all()
-        
-        matched_title, match_score = _fuzzy_match_title(candidates, target_name_norm)
+        t_id, match_score = title_index.match(folder_year, target_name_norm)
         
-        if matched_title:
-            t_id = matched_title.title_id
-            
+        if t_id:
             # Check if another folder already claimed this title
             if t_id in claimed_titles:
                 existing_folder, existing_score = claimed_titles[t_id]
-                print(f"[Warning] Multiple folders matched to Title ID {t_id} ('{matched_title.name_original}').")
+                print(f"[Warning] Multiple folders matched to Title ID {t_id} ('{title_index.original_names[t_id]}').")
                 print(f"  - Existing match:     '{existing_folder.title_folder_name}' (Score: {existing_score})")
                 print(f"  - New possible match: '{folder.title_folder_name}' (Score: {match_score})")
                 
@@ -258,60 +445,204 @@ async def link_video_assets(db: AsyncSession, candidate_title_ids: Optional[List
                     folder.title_id = t_id
                     links_modified += 1
 
-        # If the folder is successfully linked, link its assets
-        if folder.title_id:
-            ep_list_stmt = (
-                select(Episode.episode_id, Season.season_number, Episode.episode_number)
-                .join(Season)
-                .where(Episode.title_id == folder.title_id)
-            )
-            ep_results = (await db.execute(ep_list_stmt)).all()
-
-            ep_lookup = {(r.season_number, r.episode_number): r.episode_id for r in ep_results}
-
-            for asset in folder.video_assets:
-                if asset.video_type == VideoType.episode:
-                    ep_match = EPISODE_REGEX.search(asset.file_name)
-                    if ep_match:
-                        s_num, e_num = map(int, ep_match.groups())
-                        ep_id = ep_lookup.get((s_num, e_num))
-                        
-                        if ep_id and asset.episode_id != ep_id:
-                            asset.episode_id = ep_id
-                            links_modified += 1
-
-    if links_modified > 0:
+    # Link the assets of linked folders, skipping those where neither the
+    # assets nor the title's episodes changed since the last pass
+    episode_stamps = await _load_episode_stamps(db, {folder.title_id for folder in folders if folder.title_id})
+
+    changed_folders = [
+        folder for folder in folders
+        if folder.title_id and _link_fingerprint(folder, episode_stamps) != folder.link_fingerprint
+    ]
+
+    episode_maps = await _load_episode_maps(db, {folder.title_id for folder in changed_folders})
+    for folder in changed_folders:
+        ep_lookup = episode_maps.get(folder.title_id, {})
+
+        for asset in folder.video_assets:
+            if asset.video_type == VideoType.episode:
+                ep_match = EPISODE_REGEX.search(asset.file_name)
+                if ep_match:
+                    s_num, e_num = map(int, ep_match.groups())
+                    ep_id = ep_lookup.get((s_num, e_num))
+                    
+                    if ep_id and asset.episode_id != ep_id:
+                        asset.episode_id = ep_id
+                        links_modified += 1
+
+        folder.link_fingerprint = _link_fingerprint(folder, episode_stamps)
+
+    if links_modified > 0 or changed_folders:
         await db.commit()
 
     return links_modified
 
 
-def _fuzzy_match_title(candidates: List[Title], target_name_norm: str) -> Tuple[Optional[Title], int]:
-    """Helper to handle the fuzzy matching logic for titles. Returns (Title, Score)."""
-    best_fuzzy_score = 0
-    matched_title = None
-
-    for candidate in candidates:
-        names_to_check = [("Original", candidate.name_original)]
-        for trans in candidate.translations:
-            if trans.name:
-                names_to_check.append(("Translation", trans.name))
+async def _load_episode_stamps(db: AsyncSession, title_ids: Set[int]) -> Dict[int, Tuple[int, int]]:
+    """(episode count, highest episode_id) per title, which changes whenever episodes are added or removed."""
+    if not title_ids:
+        return {}
+    stmt = (
+        select(Episode.title_id, func.count(), func.max(Episode.episode_id))
+        .where(Episode.title_id.in_(title_ids))
+        .group_by(Episode.title_id)
+    )
+    return {title_id: (count, max_id) for title_id, count, max_id in (await db.execute(stmt)).all()}
 
-        for _, raw_name in names_to_check:
-            db_name_norm = _normalize_string(raw_name)
-            if db_name_norm == target_name_norm:
-                return candidate, 100  # Instant perfect match
-            
-            ratio_score = fuzz.ratio(target_name_norm, db_name_norm)
-            partial_score = fuzz.partial_ratio(target_name_norm, db_name_norm)
-            
-            if ratio_score > 80 or partial_score > 80:
-                score = max(ratio_score, partial_score)
-                if score > best_fuzzy_score:
-                    best_fuzzy_score = score
-                    matched_title = candidate
 
-    return matched_title, best_fuzzy_score
+async def _load_episode_maps(db: AsyncSession, title_ids: Set[int]) -> Dict[int, Dict[Tuple[int, int], int]]:
+    """(season_number, episode_number) -> episode_id for every title, in one query."""
+    if not title_ids:
+        return {}
+    stmt = (
+        select(Episode.title_id, Episode.episode_id, Season.season_number, Episode.episode_number)
+        .join(Season)
+        .where(Episode.title_id.in_(title_ids))
+    )
+    episode_maps: Dict[int, Dict[Tuple[int, int], int]] = {}
+    for r in (await db.execute(stmt)).all():
+        episode_maps.setdefault(r.title_id, {})[(r.season_number, r.episode_number)] = r.episode_id
+    return episode_maps
+
+
+def _link_fingerprint(folder: TitleFolder, episode_stamps: Dict[int, Tuple[int, int]]) -> str:
+    assets = sorted(
+        (asset.video_asset_id, asset.file_name, asset.video_type.value, asset.episode_id)
+        for asset in folder.video_assets
+    )
+    state = (folder.title_id, episode_stamps.get(folder.title_id), assets)
+    return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+
+
+class TitleNameIndex:
+    """
+    Normalized original and translated title names grouped by release year,
+    loaded with one query. Folders are matched against their year's names
+    with rapidfuzz's C++ extractOne instead of pairwise Python comparisons.
+    """
+
+    # A name has to score above this (ratio or partial ratio) to count as a match
+    MIN_SCORE = 80
+
+    def __init__(self):
+        self.names_by_year: Dict[int, List[str]] = {}
+        self.title_ids_by_year: Dict[int, List[int]] = {}
+        self.original_names: Dict[int, str] = {}
+
+    @classmethod
+    async def load(cls, db: AsyncSession, candidate_title_ids: Optional[List[int]] = None) -> "TitleNameIndex":
+        release_year = extract('year', Title.release_date).label("release_year")
+        original_stmt = select(Title.title_id, release_year, Title.name_original.label("name"), literal(True).label("is_original"))
+        translation_stmt = (
+            select(Title.title_id, release_year, TitleTranslation.name, literal(False))
+            .join(TitleTranslation, TitleTranslation.title_id == Title.title_id)
+        )
+        if candidate_title_ids:
+            original_stmt = original_stmt.where(Title.title_id.in_(candidate_title_ids))
+            translation_stmt = translation_stmt.where(Title.title_id.in_(candidate_title_ids))
+
+        # By title with the original name first, so ties resolve the same way on every run
+        rows = (await db.execute(union_all(original_stmt, translation_stmt))).all()
+        rows.sort(key=lambda row: (row.title_id, not row.is_original))
+
+        index = cls()
+        for row in rows:
+            if row.is_original:
+                index.original_names[row.title_id] = row.name
+            name_norm = _normalize_string(row.name)
+            if row.release_year is None or not name_norm:
+                continue
+            year = int(row.release_year)
+            index.names_by_year.setdefault(year, []).append(name_norm)
+            index.title_ids_by_year.setdefault(year, []).append(row.title_id)
+        return index
+
+    def match(self, year: int, target_name_norm: str) -> Tuple[Optional[int], float]:
+        """Returns (title_id, score), exact matches score 100."""
+        names = self.names_by_year.get(year)
+        if not names or not target_name_norm:
+            return None, 0
+
+        title_ids = self.title_ids_by_year[year]
+        if target_name_norm in names:
+            return title_ids[names.index(target_name_norm)], 100  # Instant perfect match
+
+        best = None
+        for scorer in (fuzz.ratio, fuzz.partial_ratio):
+            result = process.extractOne(
+                target_name_norm, names, scorer=scorer, processor=None, score_cutoff=self.MIN_SCORE
+            )
+            if not result or result[1] <= self.MIN_SCORE:
+                continue
+            # Higher score wins, on a tie the name that comes first
+            if best is None or (result[1], -result[2]) > (best[1], -best[2]):
+                best = result
+
+        if best is None:
+            return None, 0
+        _, score, position = best
+        return title_ids[position], score
+
+
+class FolderNameIndex:
+    """
+    The reverse of TitleNameIndex: normalized title folder names grouped by
+    the year in the folder name. Finding the folders a handful of new titles
+    could match then only scores names from the same years.
+    """
+
+    def __init__(self):
+        self.names_by_year: Dict[int, List[str]] = {}
+        self.folder_ids_by_year: Dict[int, List[int]] = {}
+
+    @classmethod
+    async def load(cls, db: AsyncSession) -> "FolderNameIndex":
+        index = cls()
+        stmt = select(TitleFolder.title_folder_id, TitleFolder.title_folder_name)
+        for folder_id, folder_name in (await db.execute(stmt)).all():
+            match = TITLE_REGEX.match(folder_name)
+            name_norm = _normalize_string(match.group(1)) if match else ""
+            if not name_norm:
+                continue
+            year = int(match.group(2))
+            index.names_by_year.setdefault(year, []).append(name_norm)
+            index.folder_ids_by_year.setdefault(year, []).append(folder_id)
+        return index
+
+    def find(self, title_index: TitleNameIndex) -> Set[int]:
+        """Folders that share a year with one of the indexed titles and score above its match threshold."""
+        found = set()
+        for year, title_names in title_index.names_by_year.items():
+            folder_names = self.names_by_year.get(year)
+            if not folder_names:
+                continue
+            folder_ids = self.folder_ids_by_year[year]
+            for title_name in title_names:
+                for scorer in (fuzz.ratio, fuzz.partial_ratio):
+                    for _, score, position in process.extract(
+                        title_name, folder_names, scorer=scorer, processor=None,
+                        score_cutoff=TitleNameIndex.MIN_SCORE, limit=None
+                    ):
+                        if score > TitleNameIndex.MIN_SCORE:
+                            found.add(folder_ids[position])
+        return found
+
+
+async def _find_candidate_folder_ids(db: AsyncSession, title_index: TitleNameIndex, candidate_title_ids: List[int]) -> List[int]:
+    global _folder_name_index
+    if _folder_name_index is None:
+        _folder_name_index = await FolderNameIndex.load(db)
+
+    folder_ids = _folder_name_index.find(title_index)
+
+    # Folders linked to a candidate already need their episodes relinked, even if the name drifted
+    linked_stmt = select(TitleFolder.title_folder_id).where(TitleFolder.title_id.in_(candidate_title_ids))
+    folder_ids.update((await db.execute(linked_stmt)).scalars())
+    return sorted(folder_ids)
+
+
+def _invalidate_folder_name_index():
+    global _folder_name_index
+    _folder_name_index = None
 
 
 def _normalize_string(s: str) -> str:
@@ -321,52 +652,78 @@ def _normalize_string(s: str) -> str:
 
 # --------- PRUNING RECORDS ---------
 
+# Paths found by a sync, filled right before pruning and dropped with the commit
+_seen_paths_table = Table(
+    "seen_video_asset_paths", MetaData(),
+    Column("file_path", String(512), primary_key=True),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
 async def _prune_removed_libraries(db: AsyncSession, active_paths: List[str]) -> Tuple[int, int, int]:
     """Needs to delete assets, and also delete newly orphaned folders."""
-    stmt = select(VideoAsset)
-    db_assets = (await db.execute(stmt)).scalars().all()
     safe_active_paths = [(Path(p).as_posix() + "/") for p in active_paths]
-    
-    pruned_assets, pruned_links = 0, 0
-    
-    for asset in db_assets:
-        normalized_db_path = Path(asset.file_path).as_posix()
-        if not any(normalized_db_path.startswith(sp) for sp in safe_active_paths):
-            if asset.episode_id: pruned_links += 1
-            await db.delete(asset)
-            pruned_assets += 1
 
-    await db.commit()
+    # One DELETE, the database checks the prefixes instead of Python
+    outside_libraries = and_(true(), *(
+        ~VideoAsset.file_path.startswith(prefix, autoescape=True) for prefix in safe_active_paths
+    ))
+    pruned_assets, pruned_links = await _delete_assets(db, outside_libraries)
     
     # Prune empty TitleFolders
-    stmt_folders = select(TitleFolder).where(~TitleFolder.video_assets.any())
-    empty_folders = (await db.execute(stmt_folders)).scalars().all()
-    pruned_folders = len(empty_folders)
-    for f in empty_folders:
-        await db.delete(f)
+    deleted_folders = (
+        delete(TitleFolder)
+        .where(~TitleFolder.video_assets.any())
+        .returning(TitleFolder.title_folder_id)
+        .cte("deleted_folders")
+    )
+    pruned_folders = (await db.execute(select(func.count()).select_from(deleted_folders))).scalar_one()
         
     await db.commit()
 
     return pruned_assets, pruned_links, pruned_folders
 
 
-async def _prune_stale_assets(db: AsyncSession, root_path: str, seen_paths: Set[str]) -> Tuple[int, int]:
-    search_path = os.path.join(root_path, '')
-    stmt = select(VideoAsset).where(VideoAsset.file_path.like(f"{search_path}%"))
-    result = await db.execute(stmt)
-    db_assets = result.scalars().all()
+async def _prune_stale_assets(db: AsyncSession, path_prefixes: List[str], seen_paths: Set[str]) -> Tuple[int, int]:
+    """Deletes assets under the prefixes that the sync didn't see, as an anti-join against a temp table of seen paths."""
+    under_prefixes = or_(*(VideoAsset.file_path.startswith(prefix, autoescape=True) for prefix in path_prefixes))
 
-    pruned_assets = 0
-    pruned_links = 0
-    
-    for asset in db_assets:
-        if asset.file_path not in seen_paths:
-            if asset.title_id or asset.episode_id:
-                pruned_links += 1
-            await db.delete(asset)
-            pruned_assets += 1
-    
-    if pruned_assets > 0:
-        await db.commit()
+    if seen_paths:
+        connection = await db.connection()
+        await connection.run_sync(_seen_paths_table.create)
+        # One statement with the paths as a single array parameter
+        paths = select(func.unnest(bindparam("paths", type_=ARRAY(String))))
+        await db.execute(insert(_seen_paths_table).from_select(["file_path"], paths), {"paths": list(seen_paths)})
+        not_seen = ~exists().where(_seen_paths_table.c.file_path == VideoAsset.file_path)
+        stale = and_(under_prefixes, not_seen)
+    else:
+        stale = under_prefixes
+
+    pruned_assets, pruned_links = await _delete_assets(db, stale)
+    # Also drops the temp table
+    await db.commit()
         
-    return pruned_assets, pruned_links
\ No newline at end of file
+    return pruned_assets, pruned_links
+
+
+async def _delete_assets(db: AsyncSession, condition) -> Tuple[int, int]:
+    """Deletes matching assets in the database and returns (deleted assets, of which linked to an episode)."""
+    deleted = (
+        delete(VideoAsset)
+        .where(condition)
+        .returning(VideoAsset.episode_id)
+        .cte("deleted_assets")
+    )
+    counts = select(func.count(), func.count(deleted.c.episode_id)).select_from(deleted)
+    pruned_assets, pruned_links = (await db.execute(counts)).one()
+    return pruned_assets, pruned_links
+
+
+async def _prune_empty_folders(db: AsyncSession, folder_paths: Set[str]):
+    """Drops the given TitleFolders once they have no assets left, e.g. after the folder was deleted."""
+    stmt = delete(TitleFolder).where(
+        TitleFolder.title_folder_path.in_(folder_paths), ~TitleFolder.video_assets.any()
+    )
+    await db.execute(stmt)
+    await db.commit()
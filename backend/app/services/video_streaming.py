@@ -0,0 +1,263 @@
+import os
+import time
+import anyio
+import secrets
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
+from app.models import VideoAsset
+
+# Bytes per chunk sent to the server
+VIDEO_STREAM_CHUNK_SIZE = int(os.getenv("VIDEO_STREAM_CHUNK_SIZE", 1024 * 1024))
+
+# Chunks read per worker thread hop, the hop costs more than the pread
+VIDEO_STREAM_CHUNKS_PER_READ = 4
+
+# Range sets still larger than this after coalescing are refused with 416
+MAX_RANGES = 64
+
+# Ranges closer than this are merged, a multipart header costs about as much
+MULTIPART_GAP_BYTES = 80
+
+# Seconds a cached stat result is trusted before the file is checked again
+VIDEO_ASSET_STAT_TTL = float(os.getenv("VIDEO_ASSET_STAT_TTL", 10))
+
+VIDEO_CONTENT_TYPES = {
+    ".mkv": "video/x-matroska",
+    ".webm": "video/webm",
+}
+
+
+@dataclass
+class CachedVideoAsset:
+    file_path: str
+    stat_result: os.stat_result
+    checked_at: float
+
+
+# video_asset_id -> file location and stat, cleared whenever the library is synced
+_video_asset_cache: Dict[int, CachedVideoAsset] = {}
+
+
+def invalidate_video_asset_cache():
+    _video_asset_cache.clear()
+
+
+async def resolve_video_asset(db: AsyncSession, video_asset_id: int) -> CachedVideoAsset:
+    """
+    Returns the path and stat of a video asset. Range requests during
+    playback hit the in-memory cache, so the database is only queried once
+    per asset and the file is re-stat'ed at most every VIDEO_ASSET_STAT_TTL.
+    """
+    now = time.monotonic()
+    cached = _video_asset_cache.get(video_asset_id)
+    if cached and now - cached.checked_at < VIDEO_ASSET_STAT_TTL:
+        return cached
+
+    if cached:
+        try:
+            cached.stat_result = os.stat(cached.file_path)
+            cached.checked_at = now
+            return cached
+        except FileNotFoundError:
+            # Possibly moved since the last sync, look it up again
+            _video_asset_cache.pop(video_asset_id, None)
+
+    stmt = select(VideoAsset.file_path).where(VideoAsset.video_asset_id == video_asset_id)
+    video_path = (await db.execute(stmt)).scalar_one_or_none()
+
+    if not video_path:
+        raise HTTPException(status_code=404, detail="Video asset record not found")
+
+    try:
+        stat_result = os.stat(video_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Video file missing on disk")
+
+    cached = CachedVideoAsset(file_path=video_path, stat_result=stat_result, checked_at=now)
+    _video_asset_cache[video_asset_id] = cached
+    return cached
+
+
+def get_video_content_type(video_path: str) -> str:
+    ext = os.path.splitext(video_path)[1].lower()
+    return VIDEO_CONTENT_TYPES.get(ext, "video/mp4")
+
+
+def parse_byte_ranges(range_header: Optional[str], file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parses a `bytes=` range set into sorted, inclusive (start, end) tuples.
+    Overlapping ranges, and ranges separated by less than the cost of an
+    extra multipart header, are coalesced into one.
+
+    Returns None when the header is missing or malformed, in which case the
+    whole file should be served. Raises a 416 when no range is satisfiable
+    or too many remain, a multi-GB video must never be sent whole instead.
+    """
+    if not range_header:
+        return None
+
+    units, _, value = range_header.partition("=")
+    if units.strip().lower() != "bytes":
+        return None
+
+    specs = [spec.strip() for spec in value.split(",") if spec.strip()]
+    if not specs:
+        return None
+
+    ranges = []
+    for spec in specs:
+        start_str, sep, end_str = spec.partition("-")
+        if not sep:
+            return None
+
+        try:
+            if start_str == "":
+                length = int(end_str)
+                if length <= 0:
+                    continue
+                start, end = max(file_size - length, 0), file_size - 1
+            else:
+                start = int(start_str)
+                end = min(int(end_str), file_size - 1) if end_str else file_size - 1
+        except ValueError:
+            return None
+
+        if start < 0 or start > end:
+            continue
+        ranges.append((start, end))
+
+    unsatisfiable = HTTPException(
+        status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{file_size}"}
+    )
+    if not ranges:
+        raise unsatisfiable
+
+    ranges.sort()
+    coalesced = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = coalesced[-1]
+        if start <= last_end + 1 + MULTIPART_GAP_BYTES:
+            coalesced[-1] = (last_start, max(last_end, end))
+        else:
+            coalesced.append((start, end))
+
+    if len(coalesced) > MAX_RANGES:
+        raise unsatisfiable
+    return coalesced
+
+
+class VideoFileResponse(StreamingResponse):
+    """
+    Streams a file, a single byte range or a multipart/byteranges body.
+
+    Chunks are read with positional `os.pread` calls, several per hop to a
+    worker thread, and sent `chunk_size` bytes at a time. uvicorn supports
+    neither the ASGI zero-copy nor the pathsend extension, so there's no
+    sendfile path.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        file_size: int,
+        content_type: str,
+        ranges: Optional[List[Tuple[int, int]]] = None,
+        headers: Optional[dict] = None,
+        chunk_size: int = VIDEO_STREAM_CHUNK_SIZE,
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._is_head = False
+
+        headers = dict(headers or {})
+        headers["Accept-Ranges"] = "bytes"
+
+        self.epilogue = b""
+
+        if not ranges:
+            self.parts = [(b"", 0, file_size - 1)]
+            status_code = 200
+            headers["Content-Type"] = content_type
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.parts = [(b"", start, end)]
+            status_code = 206
+            headers["Content-Type"] = content_type
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        else:
+            # Every part header after the first also terminates the previous part
+            boundary = secrets.token_hex(12)
+            self.parts = [
+                (
+                    (
+                        ("\r\n" if i > 0 else "")
+                        + f"--{boundary}\r\n"
+                        + f"Content-Type: {content_type}\r\n"
+                        + f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+                    ).encode("latin-1"),
+                    start,
+                    end,
+                )
+                for i, (start, end) in enumerate(ranges)
+            ]
+            self.epilogue = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            status_code = 206
+            headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+
+        headers["Content-Length"] = str(
+            sum(len(prefix) + end - start + 1 for prefix, start, end in self.parts) + len(self.epilogue)
+        )
+        super().__init__(self._iter_parts(), status_code=status_code, headers=headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._is_head = scope.get("method", "GET").upper() == "HEAD"
+        await super().__call__(scope, receive, send)
+
+    async def stream_response(self, send: Send) -> None:
+        if self._is_head:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        await super().stream_response(send)
+
+    async def _iter_parts(self):
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            for prefix, start, end in self.parts:
+                if prefix:
+                    yield prefix
+                offset = start
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunks = await anyio.to_thread.run_sync(
+                        _read_chunks, fd, offset, min(self.chunk_size * VIDEO_STREAM_CHUNKS_PER_READ, remaining), self.chunk_size
+                    )
+                    if not chunks:
+                        raise RuntimeError(f"File at path {self.path} is shorter than expected.")
+                    for data in chunks:
+                        offset += len(data)
+                        remaining -= len(data)
+                        yield data
+            if self.epilogue:
+                yield self.epilogue
+        finally:
+            os.close(fd)
+
+
+def _read_chunks(fd: int, offset: int, length: int, chunk_size: int) -> List[bytes]:
+    """Reads up to `length` bytes as `chunk_size` pieces, fewer if the file ends early."""
+    chunks = []
+    while length > 0:
+        data = os.pread(fd, min(chunk_size, length), offset)
+        if not data:
+            break
+        chunks.append(data)
+        offset += len(data)
+        length -= len(data)
+    return chunks
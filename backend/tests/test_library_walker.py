@@ -0,0 +1,72 @@
+import os
+import errno
+import asyncio
+import pytest
+from app.services import library_walker
+from app.services.library_walker import list_title_folders, walk_library, walk_title_folder
+
+
+def _touch(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+async def _collect(root_path: str):
+    return [walked async for walked in walk_library(root_path)]
+
+
+def test_vanished_root_raises(tmp_path):
+    missing = str(tmp_path / "unmounted")
+    with pytest.raises(FileNotFoundError):
+        list_title_folders(missing)
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(_collect(missing))
+
+
+def test_unreadable_root_raises(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if path == root:
+            raise OSError(errno.EIO, "Input/output error", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(library_walker.os, "scandir", scandir)
+    with pytest.raises(OSError):
+        asyncio.run(_collect(root))
+
+
+def test_unreadable_subdirectory_marks_folder_failed(tmp_path, monkeypatch):
+    folder = tmp_path / "Movie (2020)"
+    _touch(str(folder / "Movie.mkv"))
+    _touch(str(folder / "Extras" / "Trailer.mkv"))
+    extras = str(folder / "Extras")
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if path == extras:
+            raise OSError(errno.ESTALE, "Stale file handle", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(library_walker.os, "scandir", scandir)
+    walked = walk_title_folder(str(folder))
+    assert isinstance(walked.error, OSError)
+    assert [f.name for f in walked.files] == ["Movie.mkv"]
+
+
+def test_removed_title_folder_is_empty(tmp_path):
+    walked = walk_title_folder(str(tmp_path / "Gone (1999)"))
+    assert walked.error is None
+    assert walked.files == []
+
+
+def test_walk_library(tmp_path):
+    _touch(str(tmp_path / "A (2001)" / "A.mkv"))
+    _touch(str(tmp_path / "A (2001)" / "notes.txt"))
+    _touch(str(tmp_path / "B (2002)" / "Season 1" / "B S01E01.mp4"))
+    walked = {folder.name: folder for folder in asyncio.run(_collect(str(tmp_path)))}
+    assert sorted(walked) == ["A (2001)", "B (2002)"]
+    assert [f.name for f in walked["A (2001)"].files] == ["A.mkv"]
+    assert walked["B (2002)"].files[0].subdirs == ("Season 1",)
+    assert all(folder.error is None for folder in walked.values())
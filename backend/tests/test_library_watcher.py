@@ -0,0 +1,23 @@
+import os
+from app.services.library_watcher import _title_folder_of
+
+LIBRARIES = [os.path.join(os.sep, "data", "movies"), os.path.join(os.sep, "data", "tv")]
+
+
+def test_title_folder_of():
+    movie = os.path.join(LIBRARIES[0], "Movie (2020)")
+    assert _title_folder_of(LIBRARIES, os.path.join(movie, "Movie.mkv")) == movie
+    assert _title_folder_of(LIBRARIES, movie) == movie
+    assert _title_folder_of(LIBRARIES, os.path.join(LIBRARIES[1], "Show (2010)", "Season 1", "x.mkv")) == \
+        os.path.join(LIBRARIES[1], "Show (2010)")
+
+
+def test_title_folder_of_dotted_names():
+    folder = os.path.join(LIBRARIES[0], "..Movie (2020)")
+    assert _title_folder_of(LIBRARIES, os.path.join(folder, "Movie.mkv")) == folder
+
+
+def test_title_folder_of_outside_libraries():
+    assert _title_folder_of(LIBRARIES, LIBRARIES[0]) is None
+    assert _title_folder_of(LIBRARIES, os.path.join(os.sep, "data", "music", "x.mkv")) is None
+    assert _title_folder_of(LIBRARIES, os.path.join(os.sep, "data")) is None
@@ -0,0 +1,105 @@
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from app.services.video_streaming import MAX_RANGES, VideoFileResponse, parse_byte_ranges
+
+FILE_SIZE = 100_000
+
+
+def test_parse_byte_ranges():
+    assert parse_byte_ranges(None, FILE_SIZE) is None
+    assert parse_byte_ranges("items=0-1", FILE_SIZE) is None
+    assert parse_byte_ranges("bytes=abc", FILE_SIZE) is None
+    assert parse_byte_ranges("bytes=0-99", FILE_SIZE) == [(0, 99)]
+    assert parse_byte_ranges("bytes=-500", FILE_SIZE) == [(99_500, 99_999)]
+    assert parse_byte_ranges("bytes=99000-", FILE_SIZE) == [(99_000, 99_999)]
+    # Overlapping and nearly adjacent ranges are merged
+    assert parse_byte_ranges("bytes=50-99,0-60,120-130,5000-5001", FILE_SIZE) == [(0, 130), (5000, 5001)]
+    # Unsatisfiable ranges are dropped from a set that has satisfiable ones
+    assert parse_byte_ranges("bytes=0-9,200000-", FILE_SIZE) == [(0, 9)]
+
+
+@pytest.mark.parametrize("range_header", ["bytes=200000-", "bytes=100000-100010", "bytes=-0", "bytes=10-5"])
+def test_unsatisfiable_ranges_raise_416(range_header):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_byte_ranges(range_header, FILE_SIZE)
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers["Content-Range"] == f"bytes */{FILE_SIZE}"
+
+
+def test_too_many_ranges():
+    spread = ",".join(f"{i * 1000}-{i * 1000 + 9}" for i in range(MAX_RANGES + 1))
+    with pytest.raises(HTTPException) as exc_info:
+        parse_byte_ranges(f"bytes={spread}", FILE_SIZE)
+    assert exc_info.value.status_code == 416
+
+    # As many ranges that coalesce into one are fine
+    adjacent = ",".join(f"{i * 10}-{i * 10 + 9}" for i in range(MAX_RANGES * 2))
+    assert parse_byte_ranges(f"bytes={adjacent}", FILE_SIZE) == [(0, MAX_RANGES * 20 - 1)]
+
+
+@pytest.fixture
+def client(tmp_path):
+    video_path = tmp_path / "video.mkv"
+    data = bytes(range(256)) * (FILE_SIZE // 256) + bytes(FILE_SIZE % 256)
+    video_path.write_bytes(data)
+
+    app = FastAPI()
+
+    @app.api_route("/video", methods=["GET", "HEAD"])
+    async def video(request: Request):
+        ranges = parse_byte_ranges(request.headers.get("range"), FILE_SIZE)
+        return VideoFileResponse(str(video_path), FILE_SIZE, "video/x-matroska", ranges=ranges)
+
+    return TestClient(app), data
+
+
+def test_response_ranges(client):
+    client, data = client
+    response = client.get("/video")
+    assert response.status_code == 200 and response.content == data
+
+    response = client.get("/video", headers={"range": "bytes=100-2000"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-2000/{FILE_SIZE}"
+    assert response.content == data[100:2001]
+
+    response = client.head("/video", headers={"range": "bytes=0-9"})
+    assert response.status_code == 206 and response.headers["content-length"] == "10" and response.content == b""
+
+
+def test_response_unsatisfiable_range(client):
+    client, _ = client
+    response = client.get("/video", headers={"range": "bytes=200000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{FILE_SIZE}"
+
+
+def test_response_reads_several_chunks_per_thread_hop(tmp_path, monkeypatch):
+    from app.services import video_streaming
+
+    video_path = tmp_path / "video.mkv"
+    data = bytes(range(256)) * (FILE_SIZE // 256) + bytes(FILE_SIZE % 256)
+    video_path.write_bytes(data)
+    reads = []
+    real_read_chunks = video_streaming._read_chunks
+
+    def read_chunks(*args):
+        chunks = real_read_chunks(*args)
+        reads.append(len(chunks))
+        return chunks
+
+    monkeypatch.setattr(video_streaming, "_read_chunks", read_chunks)
+    app = FastAPI()
+
+    @app.get("/video")
+    async def video(request: Request):
+        ranges = parse_byte_ranges(request.headers.get("range"), FILE_SIZE)
+        return VideoFileResponse(str(video_path), FILE_SIZE, "video/mp4", ranges=ranges, chunk_size=1000)
+
+    response = TestClient(app).get("/video", headers={"range": "bytes=0-49999,60000-"})
+    assert response.status_code == 206
+    assert data[:50_000] in response.content and data[60_000:] in response.content
+    # 90 chunks of 1000 bytes in two parts, four chunks per hop
+    assert sum(reads) == 90 and max(reads) == video_streaming.VIDEO_STREAM_CHUNKS_PER_READ
+    assert len(reads) == 23
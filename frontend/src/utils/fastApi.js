@@ -251,10 +251,13 @@ export const fastApi = {
     },
     media: {
         videoAssets: {
-            sync: async () => fetchData({
+            sync: async (resume = false) => fetchData({
                 method: 'post',
-                url: `/media/video_assets/sync`
+                url: `/media/video_assets/sync`,
+                config: { params: { resume } }
             }),
+            // Server-sent events with the progress of a sync job, for EventSource
+            syncEventsUrl: (jobId) => `${API_BASE_URL}/media/video_assets/sync/${jobId}/events`,
             titleFolders: async () => fetchData({
                 method: 'get',
                 url: `/media/video_assets/title_folders`